@@ -15,6 +15,9 @@ echo "🚀 Running aggregated bench against http://${SRV_IP}:${AGG_HTTP_PORT} (m
 echo "📄 bench_pd.py = ${SCRIPT_DIR}/bench_pd.py"
 
 # Hand through any extra CLI args to bench_pd.py (e.g., --requests, --concurrency, etc.)
+# bench_pd.py also scrapes the servers' /metrics every second (each scrape times out after ~1 s) and
+# prints a live status line to stderr every 5 s; add --scrape-interval 0 --live-interval 0 for a
+# client-only run as before.
 python3 "${SCRIPT_DIR}/bench_pd.py" \
   --host "${SRV_IP}" \
   --port "${AGG_HTTP_PORT}" \
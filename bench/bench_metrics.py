@@ -0,0 +1,231 @@
+# bench/bench_metrics.py
+# Server-side view for bench_pd.py: scrapes the vLLM /metrics endpoints of the prefill and
+# decode instances (or the aggregated server) during a run, and prints a live rolling view
+# of client throughput / TTFT percentiles next to the server gauges.
+
+import asyncio, aiohttp, csv, os, sys, time
+from collections import deque
+from urllib.parse import urlparse
+
+from bench_stats import percentile
+
+# column -> Prometheus names, newest vLLM name first (values are summed over label sets)
+SERIES = {
+    "running": ["vllm:num_requests_running"],
+    "waiting": ["vllm:num_requests_waiting"],
+    "kv_cache_usage": ["vllm:kv_cache_usage_perc", "vllm:gpu_cache_usage_perc"],
+    "preemptions_total": ["vllm:num_preemptions_total", "vllm:num_preemptions"],
+    "prefix_hits_total": ["vllm:prefix_cache_hits_total", "vllm:gpu_prefix_cache_hits_total"],
+    "prefix_queries_total": ["vllm:prefix_cache_queries_total", "vllm:gpu_prefix_cache_queries_total"],
+}
+SERVER_COLS = ["t", "target", *SERIES, "preemptions", "prefix_hit_rate"]
+
+def parse_prometheus(text:str)->dict:
+    """Prometheus text exposition -> {metric name: value summed over label sets}."""
+    out = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        brace = line.find("{")
+        if brace >= 0:
+            name = line[:brace]
+            rest = line[line.rfind("}") + 1:].split()
+        else:
+            name, *rest = line.split()
+        if not rest:
+            continue
+        try:
+            out[name] = out.get(name, 0.0) + float(rest[0])
+        except ValueError:
+            continue
+    return out
+
+def disagg_targets(host:str=None)->dict:
+    """Prefill/decode /metrics URLs from the same env variables as setup/pd_disagg_setup.sh.
+    The host of the benchmarked URL wins; SRV_IP is only the fallback when there is none."""
+    ip = host or os.getenv("SRV_IP", "127.0.0.1")
+    return {
+        "prefill": f"http://{ip}:{os.getenv('PROD_HTTP_PORT', '8100')}/metrics",
+        "decode": f"http://{ip}:{os.getenv('CONS_HTTP_PORT', '8200')}/metrics",
+    }
+
+def default_targets(endpoint:str)->dict:
+    """Scrape targets for an endpoint: the prefill and decode instances when it is the proxy
+    (PROXY_HTTP_PORT), otherwise the benchmarked server itself."""
+    u = urlparse(endpoint)
+    if u.port == int(os.getenv("PROXY_HTTP_PORT", "10001")):
+        return disagg_targets(u.hostname)
+    return {"server": f"{u.scheme}://{u.netloc}/metrics"}
+
+def parse_targets(items)->dict:
+    """['name=url', ...] -> {name: url}"""
+    out = {}
+    for item in items:
+        name, sep, url = item.partition("=")
+        if not sep:
+            raise ValueError(f"bad --metrics-target '{item}' (expected NAME=URL)")
+        out[name] = url
+    return out
+
+class MetricsScraper:
+    """Polls each target's /metrics every `interval` seconds into `rows` (one row per target per tick).
+    Times are seconds since `t_ref` (a time.perf_counter() value shared with the client samples).
+    Each scrape has its own short timeout: the shared session's is the benchmark's --http-timeout."""
+
+    def __init__(self, session, targets:dict, interval:float, t_ref:float, log=print):
+        self.session, self.targets, self.interval, self.t_ref, self.log = session, targets, interval, t_ref, log
+        self.rows = []
+        self.latest = {}
+        self._first = {}
+        self._prev = {}
+        self._down = set()
+        self._task = None
+        self._timeout = aiohttp.ClientTimeout(total=max(1.0, interval))
+
+    async def _scrape(self, name, url):
+        try:
+            async with self.session.get(url, timeout=self._timeout) as resp:
+                text = await resp.text()
+                if resp.status != 200:
+                    raise RuntimeError(f"HTTP {resp.status}")
+        except Exception as e:
+            if name not in self._down:
+                self.log(f"[METRICS] {name} ({url}) unavailable: {str(e) or type(e).__name__}")
+                self._down.add(name)
+            return
+        self._down.discard(name)
+        vals = parse_prometheus(text)
+        row = {"t": round(time.perf_counter() - self.t_ref, 3), "target": name}
+        for col, names in SERIES.items():
+            row[col] = next((vals[n] for n in names if n in vals), None)
+        first = self._first.setdefault(name, row)
+        prev = self._prev.get(name)
+        if row["preemptions_total"] is not None and first["preemptions_total"] is not None:
+            row["preemptions"] = row["preemptions_total"] - first["preemptions_total"]
+        else:
+            row["preemptions"] = None
+        row["prefix_hit_rate"] = None
+        if prev and None not in (row["prefix_hits_total"], row["prefix_queries_total"],
+                                 prev["prefix_hits_total"], prev["prefix_queries_total"]):
+            dq = row["prefix_queries_total"] - prev["prefix_queries_total"]
+            if dq > 0:
+                row["prefix_hit_rate"] = (row["prefix_hits_total"] - prev["prefix_hits_total"]) / dq
+        self._prev[name] = row
+        self.latest[name] = row
+        self.rows.append(row)
+
+    async def _loop(self):
+        while True:
+            await asyncio.gather(*[self._scrape(n, u) for n, u in self.targets.items()])
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            # One final sample so counters cover the whole run
+            await asyncio.gather(*[self._scrape(n, u) for n, u in self.targets.items()])
+
+    def summary_lines(self):
+        """Per-target peaks over the run, for the text report."""
+        lines = []
+        for name in self.targets:
+            rows = [r for r in self.rows if r["target"] == name]
+            if not rows:
+                lines.append(f"  {name}: no samples")
+                continue
+            peak = lambda c: max((r[c] for r in rows if r[c] is not None), default=float("nan"))
+            last = rows[-1]
+            q = [r for r in rows if r["prefix_queries_total"] is not None]
+            hit = float("nan")
+            if len(q) >= 2 and q[-1]["prefix_queries_total"] > q[0]["prefix_queries_total"]:
+                hit = (q[-1]["prefix_hits_total"] - q[0]["prefix_hits_total"]) / \
+                      (q[-1]["prefix_queries_total"] - q[0]["prefix_queries_total"])
+            lines.append(f"  {name}: samples={len(rows)}  max_running={peak('running'):.0f}  "
+                         f"max_waiting={peak('waiting'):.0f}  peak_kv_usage={peak('kv_cache_usage'):.1%}  "
+                         f"preemptions={(last['preemptions'] or 0):.0f}  prefix_hit_rate={hit:.1%}")
+        return lines
+
+class LiveView:
+    """Client-side rolling window fed by bench_pd.run_point; prints one status line per interval."""
+
+    def __init__(self, window:float, interval:float, scraper:MetricsScraper=None, out=sys.stderr):
+        self.window, self.interval, self.scraper, self.out = window, interval, scraper, out
+        self.t0 = time.perf_counter()
+        self.ttfts = deque()  # (t, ttft)
+        self.done = deque()   # (t, tokens, dur)
+        self.n_done = self.n_err = 0
+        self._task = None
+
+    def on_ttft(self, v):
+        self.ttfts.append((time.perf_counter(), v))
+
+    def on_done(self, tokens, dur):
+        self.n_done += 1
+        self.done.append((time.perf_counter(), tokens, dur))
+
+    def on_error(self):
+        self.n_err += 1
+
+    def line(self):
+        now = time.perf_counter()
+        for dq in (self.ttfts, self.done):
+            while dq and dq[0][0] < now - self.window:
+                dq.popleft()
+        span = min(self.window, now - self.t0) or 1e-9
+        tok_s = sum(t for _, t, _ in self.done) / span
+        tt = [v for _, v in self.ttfts]
+        ttft = (f"p50_ttft={percentile(tt, 50):.3f}s p95_ttft={percentile(tt, 95):.3f}s"
+                if tt else "p50_ttft=- p95_ttft=-")
+        s = f"[live {now - self.t0:6.1f}s] done={self.n_done} err={self.n_err} tok/s={tok_s:.1f} {ttft}"
+        if self.scraper:
+            fmt = lambda v, spec: "-" if v is None else format(v, spec)
+            for name, r in self.scraper.latest.items():
+                s += (f" | {name}: run={fmt(r['running'], '.0f')} wait={fmt(r['waiting'], '.0f')}"
+                      f" kv={fmt(r['kv_cache_usage'], '.0%')}")
+                if r["preemptions"]:
+                    s += f" preempt={r['preemptions']:.0f}"
+        return s
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            print(self.line(), file=self.out, flush=True)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+def write_samples(prefix:str, trials, scraper:MetricsScraper=None, t_ref:float=0.0):
+    """Write <prefix>.client.csv (one row per request) and <prefix>.server.csv (scraped series).
+    Both share the same time origin `t_ref`."""
+    d = os.path.dirname(prefix)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    with open(f"{prefix}.client.csv", "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["trial", "phase", "t_start", "latency", "completion_tokens"])
+        for i, tr in enumerate(trials):
+            for s, v in tr["ttfts"]:
+                w.writerow([i, "ttft", round(tr["ttft_t0"] - t_ref + s, 4), round(v, 4), ""])
+            for s, dur, comp in tr["thr"]:
+                w.writerow([i, "thr", round(tr["thr_t0"] - t_ref + s, 4), round(dur, 4), comp])
+    if scraper is not None:
+        with open(f"{prefix}.server.csv", "w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=SERVER_COLS)
+            w.writeheader()
+            for r in scraper.rows:
+                w.writerow({k: r.get(k) for k in SERVER_COLS})
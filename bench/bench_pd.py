@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 # Simple TTFT & throughput benchmark (proxy OR aggregated).
 # Added: --url (e.g., --url http://127.0.0.1:9000/v1/chat/completions)
+# Added: --warmup (excluded requests), steady-state windowing, --trials with bootstrap CIs
+# Added: /metrics scraping of the vLLM instances + live rolling view (--scrape-interval, --live-interval)
 
 import asyncio, aiohttp, time, json, statistics as st, os, argparse, random, string
+from bench_stats import percentile, mean, bootstrap_ci
+from bench_metrics import LiveView, MetricsScraper, default_targets, parse_targets, write_samples
 
 def make_prompt(n_tokens:int)->str:
     words = ["".join(random.choices(string.ascii_lowercase, k=5)) for _ in range(n_tokens)]
@@ -48,71 +52,267 @@ async def throughput_one(session, url, headers, model, prompt, max_tokens):
     dur = t1 - t0
     return comp, dur, 200, None
 
-async def run(args):
-    if args.url:
-        base = args.url.rstrip("/")
+async def run_point(session, base, headers, model, requests, concurrency, prompt_tokens, max_tokens, log=print, monitor=None):
+    """Run the TTFT phase then the throughput phase for one sweep point and return raw stats.
+    Times are seconds relative to the start of each phase, so a steady-state window can be cut later.
+    """
+    prompts = [make_prompt(prompt_tokens) for _ in range(requests)]
+
+    # TTFT
+    sem = asyncio.Semaphore(concurrency)
+    ttfts = []  # (start, ttft)
+    t_ttft = time.perf_counter()
+    async def ttft_task(p):
+        async with sem:
+            start = time.perf_counter() - t_ttft
+            try:
+                v = await ttft_one(session, base, headers, model, p, max_tokens)
+                if v is not None:
+                    ttfts.append((start, v))
+                    if monitor: monitor.on_ttft(v)
+            except Exception as e:
+                if monitor: monitor.on_error()
+                log(f"[TTFT] error: {e}")
+
+    await asyncio.gather(*[ttft_task(p) for p in prompts])
+
+    # Throughput
+    sem2 = asyncio.Semaphore(concurrency)
+    thr = []  # (start, dur, completion_tokens)
+    errors = 0
+    t0 = time.perf_counter()
+    async def thr_task(p):
+        nonlocal errors
+        async with sem2:
+            start = time.perf_counter() - t0
+            try:
+                comp, dur, code, err = await throughput_one(session, base, headers, model, p, max_tokens)
+                if code == 200 and comp is not None:
+                    thr.append((start, dur, comp))
+                    if monitor: monitor.on_done(comp, dur)
+                else:
+                    errors += 1
+                    if monitor: monitor.on_error()
+                    if err: log(f"[THR] HTTP {code} body={err[:300]}")
+            except Exception as e:
+                errors += 1
+                if monitor: monitor.on_error()
+                log(f"[THR] error: {e}")
+
+    await asyncio.gather(*[thr_task(p) for p in prompts])
+    wall = time.perf_counter() - t0
+
+    return {"ttfts": ttfts, "thr": thr, "errors": errors, "wall": wall, "ttft_t0": t_ttft, "thr_t0": t0}
+
+async def warmup(session, base, headers, model, requests, concurrency, prompt_tokens, max_tokens, log=print):
+    """Send `requests` non-streaming requests of the measured shape and discard them
+    (absorbs CUDA graph capture, allocator growth and empty prefix caches)."""
+    if requests <= 0:
+        return
+    sem = asyncio.Semaphore(concurrency)
+    async def one():
+        async with sem:
+            try:
+                await throughput_one(session, base, headers, model, make_prompt(prompt_tokens), max_tokens)
+            except Exception as e:
+                log(f"[WARMUP] error: {e}")
+    await asyncio.gather(*[one() for _ in range(requests)])
+
+async def run_trials(session, base, headers, model, requests, concurrency, prompt_tokens, max_tokens,
+                     warmup_requests=0, trials=1, log=print, monitor=None):
+    """Warm up once, then repeat run_point `trials` times; returns the list of per-trial stats."""
+    await warmup(session, base, headers, model, warmup_requests, concurrency, prompt_tokens, max_tokens, log=log)
+    out = []
+    for _ in range(trials):
+        out.append(await run_point(session, base, headers, model, requests, concurrency,
+                                   prompt_tokens, max_tokens, log=log, monitor=monitor))
+    return out
+
+async def run_monitored(session, base, headers, model, requests, concurrency, prompt_tokens, max_tokens,
+                        warmup_requests=0, trials=1, targets=None, scrape_interval=0.0,
+                        live_interval=0.0, live_window=10.0, log=print):
+    """run_trials with the server /metrics scraped (when targets and scrape_interval > 0)
+    and a live rolling view on stderr (when live_interval > 0). Both start after the warmup,
+    so peaks, counter deltas and hit rates cover the measured trials only.
+    Returns (trials, scraper or None, t_ref) where t_ref is the shared time origin."""
+    await warmup(session, base, headers, model, warmup_requests, concurrency, prompt_tokens, max_tokens, log=log)
+    t_ref = time.perf_counter()
+    scraper = MetricsScraper(session, targets, scrape_interval, t_ref, log=log) if targets and scrape_interval > 0 else None
+    live = LiveView(live_window, live_interval, scraper) if live_interval > 0 else None
+    for m in (scraper, live):
+        if m: m.start()
+    try:
+        out = await run_trials(session, base, headers, model, requests, concurrency, prompt_tokens, max_tokens,
+                               warmup_requests=0, trials=trials, log=log, monitor=live)
+    finally:
+        for m in (live, scraper):
+            if m: await m.stop()
+    return out, scraper, t_ref
+
+# A steady-state statistic needs at least max(MIN_STEADY_SAMPLES, STEADY_PER_CONC * concurrency)
+# windowed samples (pooled over trials); below that the whole run is used and the report says so.
+MIN_STEADY_SAMPLES = 20
+STEADY_PER_CONC = 2
+
+def min_steady_samples(concurrency)->int:
+    return max(MIN_STEADY_SAMPLES, STEADY_PER_CONC * concurrency)
+
+def min_steady_requests(concurrency)->int:
+    """Requests per trial that leave enough samples in the steady-state window
+    (the first `concurrency` admissions fall before the window opens)."""
+    return min_steady_samples(concurrency) + concurrency
+
+def steady_window(spans, concurrency):
+    """Steady-state window of a closed-loop phase, from (start, end) spans.
+
+    It opens when the first request completes (the synchronized initial burst is over)
+    and closes when the last request is admitted (from then on the system drains).
+    Returns None when the window would be empty.
+    """
+    if len(spans) <= concurrency:
+        return None
+    lo = min(e for _, e in spans)
+    hi = max(s for s, _ in spans)
+    return (lo, hi) if hi > lo else None
+
+def _window_keep(spans, concurrency):
+    """(indices of spans admitted inside the steady-state window, window) — ([], None) if there is none."""
+    win = steady_window(spans, concurrency)
+    if win is None:
+        return [], None
+    return [i for i, (s, _) in enumerate(spans) if win[0] <= s <= win[1]], win
+
+def _steady_tokens_per_sec(trial, win):
+    # Tokens assumed evenly spread over each request; count only the part inside the window.
+    toks = 0.0
+    for s, d, c in trial["thr"]:
+        if d > 0:
+            overlap = max(0.0, min(s + d, win[1]) - max(s, win[0]))
+            toks += c * overlap / d
+    return toks / (win[1] - win[0])
+
+def steady_samples(trials, concurrency):
+    """Cut trials down to their steady-state windows, or fall back to the whole runs.
+
+    The decision is made once per phase for all trials together, so every statistic of a
+    run has one definition. Returns a dict with per-trial groups of TTFT and per-request
+    tok/s samples, per-trial steady tok/s, the windowed sample counts and fallback flags.
+    """
+    need = min_steady_samples(concurrency)
+
+    ttft_cut = [_window_keep([(s, s + v) for s, v in t["ttfts"]], concurrency) for t in trials]
+    n_ttft_win = sum(len(k) for k, _ in ttft_cut)
+    ttft_fallback = n_ttft_win < need
+    if ttft_fallback:
+        ttft_groups = [[v for _, v in t["ttfts"]] for t in trials]
+    else:
+        ttft_groups = [[t["ttfts"][i][1] for i in k] for t, (k, _) in zip(trials, ttft_cut)]
+
+    thr_cut = [_window_keep([(s, s + d) for s, d, _ in t["thr"]], concurrency) for t in trials]
+    n_thr_win = sum(len(k) for k, _ in thr_cut)
+    thr_fallback = n_thr_win < need
+    if thr_fallback:
+        tps_groups = [[c / d for _, d, c in t["thr"] if d > 0] for t in trials]
+        steady = [sum(c for _, _, c in t["thr"]) / t["wall"] for t in trials if t["wall"] > 0]
+    else:
+        tps_groups = [[t["thr"][i][2] / t["thr"][i][1] for i in k if t["thr"][i][1] > 0]
+                      for t, (k, _) in zip(trials, thr_cut)]
+        steady = [_steady_tokens_per_sec(t, w) for t, (_, w) in zip(trials, thr_cut) if w is not None]
+
+    return {"ttft_groups": ttft_groups, "tps_groups": tps_groups, "steady": steady, "need": need,
+            "n_ttft_win": n_ttft_win, "ttft_fallback": ttft_fallback,
+            "n_thr_win": n_thr_win, "thr_fallback": thr_fallback}
+
+def format_report(trials, concurrency, warmup_requests=0, ci=0.95, n_boot=1000, scraper=None, requests=None)->str:
+    """Render stats in the text format parsed by scripts/collect_from_log.py.
+    TTFT and per-request tok/s use steady-state samples pooled over trials (or the whole
+    run, flagged, when the window holds too few); the aggregate line keeps its whole-run
+    definition (total tokens / total wall time)."""
+    cut = steady_samples(trials, concurrency)
+    ttft_groups = cut["ttft_groups"]
+    tps_groups = cut["tps_groups"]
+    ttfts = [x for g in ttft_groups for x in g]
+    tps_each = [x for g in tps_groups for x in g]
+    n_ttft_all = sum(len(t["ttfts"]) for t in trials)
+    n_thr_all = sum(len(t["thr"]) for t in trials)
+    fallback = lambda n_win: f" (fallback: whole run, window had {n_win} < {cut['need']})"
+
+    lines = []
+    if warmup_requests > 0:
+        lines.append(f"\n== Warmup: {warmup_requests} requests (excluded) ==")
+    if requests is not None:
+        lines.append(f"\n== Measured: {requests} requests x {len(trials)} trials ==")
+
+    if ttfts:
+        lines.append(f"\n== TTFT (stream=true) N={len(ttfts)} ==")
+        lines.append(f"  p50={st.median(ttfts):.3f}s  p95={percentile(ttfts, 95):.3f}s  min={min(ttfts):.3f}s  max={max(ttfts):.3f}s")
+        lines.append(f"  steady-state samples = {len(ttfts)}/{n_ttft_all}"
+                     + (fallback(cut["n_ttft_win"]) if cut["ttft_fallback"] else ""))
     else:
-        base = f"http://{args.host}:{args.port}/v1/chat/completions"
+        lines.append("\n== TTFT: none ==")
 
-    headers = {
+    toks = sum(c for t in trials for _, _, c in t["thr"])
+    wall = sum(t["wall"] for t in trials)
+    errors = sum(t["errors"] for t in trials)
+    if tps_each:
+        lines.append(f"\n== Throughput (stream=false) N={len(tps_each)}, errors={errors} ==")
+        lines.append(f"  per-request tokens/sec: p50={st.median(tps_each):.1f}  p95={percentile(tps_each, 95):.1f}  mean={st.mean(tps_each):.1f}")
+        lines.append(f"  total generated tokens = {toks}")
+        lines.append(f"  wall time (whole run)   = {wall:.2f}s")
+        lines.append(f"  aggregate throughput    = {toks/wall:.1f} tokens/sec")
+        lines.append(f"  steady-state throughput = {mean(cut['steady']):.1f} tokens/sec")
+        lines.append(f"  steady-state samples = {len(tps_each)}/{n_thr_all}"
+                     + (fallback(cut["n_thr_win"]) if cut["thr_fallback"] else ""))
+    else:
+        lines.append("\n== Throughput: none ==")
+
+    if ttfts or tps_each:
+        fmt = lambda lo, hi, p: f"[{lo:.{p}f}, {hi:.{p}f}]"
+        p50_t = bootstrap_ci(ttft_groups, st.median, n_boot, ci)
+        p95_t = bootstrap_ci(ttft_groups, lambda xs: percentile(xs, 95), n_boot, ci)
+        mtps = bootstrap_ci(tps_groups, mean, n_boot, ci)
+        # Aggregate throughput has one value per trial, so its CI needs repeated trials.
+        aggs = [[sum(c for _, _, c in t["thr"]) / t["wall"]] for t in trials if t["wall"] > 0]
+        agg = bootstrap_ci(aggs, mean, n_boot, ci) if len(aggs) >= 2 else (float("nan"), float("nan"))
+        lines.append(f"\n== CI (bootstrap {ci:.0%}, trials={len(trials)}) ==")
+        lines.append(f"  p50_ttft={fmt(*p50_t, 3)}s  p95_ttft={fmt(*p95_t, 3)}s  "
+                     f"mean_tps={fmt(*mtps, 1)}  aggregate_throughput={fmt(*agg, 1)}")
+
+    if scraper is not None:
+        lines.append(f"\n== Server metrics (scraped every {scraper.interval:g}s) ==")
+        lines.extend(scraper.summary_lines())
+    return "\n".join(lines)
+
+def endpoint_url(args)->str:
+    if args.url:
+        return args.url.rstrip("/")
+    return f"http://{args.host}:{args.port}/v1/chat/completions"
+
+def auth_headers()->dict:
+    return {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY','sk-noop')}",
     }
-    prompts = [make_prompt(args.prompt_tokens) for _ in range(args.requests)]
+
+def make_session(http_timeout:float)->aiohttp.ClientSession:
     connector = aiohttp.TCPConnector(limit=0)
-    timeout = aiohttp.ClientTimeout(total=args.http_timeout)
-    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-        # TTFT
-        sem = asyncio.Semaphore(args.concurrency)
-        ttfts = []
-        async def ttft_task(p):
-            async with sem:
-                try:
-                    v = await ttft_one(session, base, headers, args.model, p, args.max_tokens)
-                    if v is not None: ttfts.append(v)
-                except Exception as e:
-                    print(f"[TTFT] error: {e}")
-
-        await asyncio.gather(*[ttft_task(p) for p in prompts])
-        if ttfts:
-            print(f"\n== TTFT (stream=true) N={len(ttfts)} ==")
-            q95 = st.quantiles(ttfts, n=20)[18] if len(ttfts) >= 20 else max(ttfts)
-            print(f"  p50={st.median(ttfts):.3f}s  p95={q95:.3f}s  min={min(ttfts):.3f}s  max={max(ttfts):.3f}s")
-        else:
-            print("\n== TTFT: none ==")
-
-        # Throughput
-        sem2 = asyncio.Semaphore(args.concurrency)
-        toks, durs = [], []
-        errors = 0
-        async def thr_task(p):
-            nonlocal errors
-            async with sem2:
-                try:
-                    comp, dur, code, err = await throughput_one(session, base, headers, args.model, p, args.max_tokens)
-                    if code == 200 and comp is not None:
-                        toks.append(comp); durs.append(dur)
-                    else:
-                        errors += 1
-                        if err: print(f"[THR] HTTP {code} body={err[:300]}")
-                except Exception as e:
-                    errors += 1
-                    print(f"[THR] error: {e}")
-
-        t0 = time.perf_counter()
-        await asyncio.gather(*[thr_task(p) for p in prompts])
-        wall = time.perf_counter() - t0
-
-        if toks:
-            tps_each = [t/d for t,d in zip(toks,durs) if d>0]
-            q95 = st.quantiles(tps_each, n=20)[18] if len(tps_each) >= 20 else max(tps_each)
-            print(f"\n== Throughput (stream=false) N={len(toks)}, errors={errors} ==")
-            print(f"  per-request tokens/sec: p50={st.median(tps_each):.1f}  p95={q95:.1f}  mean={st.mean(tps_each):.1f}")
-            print(f"  total generated tokens = {sum(toks)}")
-            print(f"  wall time (whole run)   = {wall:.2f}s")
-            print(f"  aggregate throughput    = {sum(toks)/wall:.1f} tokens/sec")
-        else:
-            print("\n== Throughput: none ==")
+    timeout = aiohttp.ClientTimeout(total=http_timeout)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+async def run(args):
+    async with make_session(args.http_timeout) as session:
+        warm = args.concurrency if args.warmup is None else args.warmup
+        url = endpoint_url(args)
+        targets = parse_targets(args.metrics_target) if args.metrics_target else default_targets(url)
+        trials, scraper, t_ref = await run_monitored(
+            session, url, auth_headers(), args.model,
+            args.requests, args.concurrency, args.prompt_tokens, args.max_tokens,
+            warmup_requests=warm, trials=args.trials, targets=targets,
+            scrape_interval=args.scrape_interval, live_interval=args.live_interval, live_window=args.live_window)
+    print(format_report(trials, args.concurrency, warmup_requests=warm, ci=args.ci, n_boot=args.bootstrap,
+                        scraper=scraper, requests=args.requests))
+    if args.samples_prefix:
+        write_samples(args.samples_prefix, trials, scraper, t_ref)
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
@@ -125,5 +325,17 @@ if __name__ == "__main__":
     ap.add_argument("--prompt-tokens", type=int, default=64)
     ap.add_argument("--max-tokens", type=int, default=128)
     ap.add_argument("--http-timeout", type=float, default=600)
+    ap.add_argument("--warmup", type=int, default=None, help="Warmup requests excluded from results (default: --concurrency)")
+    ap.add_argument("--trials", type=int, default=1, help="Repeated measured trials (CIs resample whole trials when >= 2)")
+    ap.add_argument("--ci", type=float, default=0.95, help="Bootstrap confidence level")
+    ap.add_argument("--bootstrap", type=int, default=1000, help="Bootstrap resamples")
+    ap.add_argument("--scrape-interval", type=float, default=1.0, help="Seconds between /metrics scrapes (0 = off)")
+    ap.add_argument("--metrics-target", action="append", default=[], metavar="NAME=URL",
+                    help="Scrape target (repeatable). Default: prefill/decode on --host at PROD_HTTP_PORT, "
+                         "CONS_HTTP_PORT when benchmarking the proxy, else the server itself")
+    ap.add_argument("--live-interval", type=float, default=5.0, help="Seconds between live status lines on stderr (0 = off)")
+    ap.add_argument("--live-window", type=float, default=10.0, help="Rolling window of the live view (seconds)")
+    ap.add_argument("--samples-prefix", default=None,
+                    help="Write per-request samples to PREFIX.client.csv and scraped series to PREFIX.server.csv")
     args = ap.parse_args()
     asyncio.run(run(args))
\ No newline at end of file
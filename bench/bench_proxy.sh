@@ -8,6 +8,9 @@ SRV_IP="${SRV_IP:-172.16.40.99}"
 PROXY_HTTP_PORT="${PROXY_HTTP_PORT:-10001}"
 MODEL="${MODEL:-Qwen/Qwen2.5-7B-Instruct}"
 
+# bench_pd.py also scrapes the servers' /metrics every second (each scrape times out after ~1 s) and
+# prints a live status line to stderr every 5 s; add --scrape-interval 0 --live-interval 0 for a
+# client-only run as before.
 echo "🚀 Running bench_pd.py from $ROOT_DIR"
 python3 "${SCRIPT_DIR}/bench_pd.py" \
   --url "http://${SRV_IP}:${PROXY_HTTP_PORT}/v1/chat/completions" \
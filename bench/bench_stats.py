@@ -0,0 +1,55 @@
+# bench/bench_stats.py
+# Small stdlib-only statistics helpers shared by bench_pd.py and the analysis scripts.
+
+import math, random
+
+def percentile(xs, q:float)->float:
+    """Linear-interpolated percentile (q in [0, 100]); well-defined for any N >= 1."""
+    if not xs:
+        return float("nan")
+    s = sorted(xs)
+    if len(s) == 1:
+        return s[0]
+    pos = (len(s) - 1) * q / 100.0
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (pos - lo)
+
+def mean(xs)->float:
+    return sum(xs) / len(xs) if xs else float("nan")
+
+def bootstrap_ci(groups, stat, n_boot:int=1000, ci:float=0.95, seed:int=0):
+    """Percentile bootstrap CI of `stat` over a list of sample groups.
+
+    With two or more groups (repeated trials) whole groups are resampled and pooled,
+    so between-trial variance is captured; with a single group its samples are resampled.
+    Returns (lo, hi), or (nan, nan) if there is nothing to resample.
+    """
+    groups = [g for g in groups if g]
+    if not groups:
+        return float("nan"), float("nan")
+    rng = random.Random(seed)
+    vals = []
+    for _ in range(n_boot):
+        if len(groups) >= 2:
+            pooled = [x for g in rng.choices(groups, k=len(groups)) for x in g]
+        else:
+            pooled = rng.choices(groups[0], k=len(groups[0]))
+        vals.append(stat(pooled))
+    alpha = (1.0 - ci) / 2.0
+    return percentile(vals, 100 * alpha), percentile(vals, 100 * (1 - alpha))
+
+def t_quantile(p:float, df:int)->float:
+    """Quantile of Student's t distribution (exact for df 1-2, Cornish-Fisher expansion beyond;
+    within 1% of the exact value for df >= 3 and p <= 0.995)."""
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    from statistics import NormalDist
+    z = NormalDist().inv_cdf(p)
+    return (z
+            + (z**3 + z) / (4 * df)
+            + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * df**2)
+            + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * df**3)
+            + (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / (92160 * df**4))
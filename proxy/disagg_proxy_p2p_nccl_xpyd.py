@@ -13,6 +13,8 @@ import msgpack
 import zmq
 from quart import Quart, make_response, request
 
+import loop_monitor
+
 count = 0
 prefill_instances: dict[str, Any] = {}  # http_address: (zmq_address, stamp)
 decode_instances: dict[str, Any] = {}  # http_address: (zmq_address, stamp)
@@ -98,6 +100,8 @@ def start_service_discovery(hostname, port):
 AIOHTTP_TIMEOUT = aiohttp.ClientTimeout(total=6 * 60 * 60)
 
 app = Quart(__name__)
+# Event-loop lag histogram, slow-callback stacks and /admin/profile (see loop_monitor.py)
+loop_monitor.install(app)
 
 
 def random_uuid() -> str:
@@ -120,6 +124,18 @@ async def forward_request(url, data, request_id):
                     yield content
 
 
+@app.route("/instances", methods=["GET"])
+async def list_instances():
+    # Registered (not yet expired) instances, used by setup/launch_cluster.py
+    # to confirm that every prefill/decode instance has reached the proxy.
+    now = time.time()
+    with prefill_cv:
+        prefill = [k for k, v in prefill_instances.items() if v[1] > now]
+    with decode_cv:
+        decode = [k for k, v in decode_instances.items() if v[1] > now]
+    return {"prefill": prefill, "decode": decode}
+
+
 @app.route("/v1/completions", methods=["POST"])
 @app.route("/v1/chat/completions", methods=["POST"])
 async def handle_request():
@@ -185,6 +201,6 @@ async def handle_request():
 
 
 if __name__ == "__main__":
-    t = start_service_discovery("0.0.0.0", 30001)
-    app.run(host="0.0.0.0", port=10001)
-    t.join()
+    t = start_service_discovery("0.0.0.0", int(os.environ.get("PROXY_ZMQ_PORT", 30001)))
+    app.run(host="0.0.0.0", port=int(os.environ.get("PROXY_HTTP_PORT", 10001)))
+    # The discovery thread is a daemon; returning here lets SIGTERM stop the proxy.
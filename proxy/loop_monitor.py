@@ -0,0 +1,275 @@
+# SPDX-License-Identifier: Apache-2.0
+# Event-loop health instrumentation for the disagg proxy (cheap enough to stay on in production):
+#
+#   - lag histogram: a heartbeat task sleeps PROXY_LAG_INTERVAL_MS and records how late it woke up
+#   - slow callbacks: a watchdog thread notices a heartbeat that is more than PROXY_SLOW_CALLBACK_MS
+#     overdue and captures the event-loop thread's stack *while it is still blocked*
+#   - GC pauses: gc.callbacks time every collection (gen 2 pauses show up next to the lag)
+#   - on-demand sampling profiler: GET /admin/profile?seconds=N returns collapsed stacks
+#     ("frame;frame;frame count" lines) for flamegraph.pl / speedscope / inferno
+#
+# Steady-state cost is one heartbeat wakeup per PROXY_LAG_INTERVAL_MS, one watchdog wakeup per
+# PROXY_SLOW_CALLBACK_MS / 2 and a counter update per GC;
+# the profiler only runs while a /admin/profile request is in flight.
+#
+# Endpoints (Authorization: Bearer $PROXY_ADMIN_TOKEN required when that variable is set; without a
+# token they only answer loopback clients, since the proxy listens on all interfaces):
+#   GET /admin/loop_lag                       histogram, GC stats and recent slow-callback reports
+#   GET /admin/profile?seconds=10&hz=100&threads=loop|all
+
+import asyncio
+import gc
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Any, Optional
+
+from quart import Quart, request
+
+# Upper bounds (ms) of the lag histogram buckets; the last bucket is unbounded
+LAG_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+MAX_PROFILE_SECONDS = 120
+MAX_PROFILE_HZ = 250
+LOOPBACK = ("127.0.0.1", "::1", "localhost")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _frame_label(code) -> str:
+    # ';' separates frames in the collapsed format, so it must not appear inside a label
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class LoopMonitor:
+    def __init__(
+        self,
+        interval_ms: float = 50.0,
+        slow_ms: float = 100.0,
+        max_reports: int = 50,
+    ):
+        self.interval = interval_ms / 1000.0
+        self.slow = slow_ms / 1000.0
+        self.buckets = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.reports: deque[dict[str, Any]] = deque(maxlen=max_reports)
+        self.slow_count = 0
+        self.gc_stats = {gen: {"collections": 0, "total_ms": 0.0, "max_ms": 0.0} for gen in range(3)}
+        self._gc_ms = 0.0
+        self._gc_t0 = 0.0
+        self._loop_tid: Optional[int] = None
+        self._deadline = 0.0  # perf_counter() at which the heartbeat is due
+        self._pending: Optional[dict[str, Any]] = None  # report captured for the current stall
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._profiling = threading.Lock()
+
+    # -------- lifecycle --------
+
+    def start(self) -> None:
+        self._loop_tid = threading.get_ident()
+        self._deadline = time.perf_counter() + self.interval
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        gc.callbacks.append(self._on_gc)
+        threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True).start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        if self._task:
+            self._task.cancel()
+
+    # -------- lag histogram --------
+
+    async def _heartbeat(self) -> None:
+        while True:
+            gc_before = self._gc_ms
+            self._deadline = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (time.perf_counter() - self._deadline) * 1000.0)
+            self._observe(lag_ms)
+            if lag_ms >= self.slow * 1000.0:
+                self._finish_report(lag_ms, self._gc_ms - gc_before)
+
+    def _observe(self, lag_ms: float) -> None:
+        i = 0
+        while i < len(LAG_BUCKETS_MS) and lag_ms > LAG_BUCKETS_MS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.count += 1
+        self.sum_ms += lag_ms
+        self.max_ms = max(self.max_ms, lag_ms)
+
+    def _quantile_ms(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding quantile q (Prometheus-style estimate)."""
+        if not self.count:
+            return None
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= q * self.count:
+                return LAG_BUCKETS_MS[i] if i < len(LAG_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    # -------- slow callbacks --------
+
+    def _watchdog(self) -> None:
+        # Runs in its own thread so it can look at the loop thread while that one is stuck.
+        # Code that holds the GIL the whole time (a C call such as json.loads of a huge body, or
+        # a GC pass) cannot be sampled mid-stall; the heartbeat still records it, without a stack.
+        while not self._stop.wait(self.slow / 2):
+            deadline = self._deadline
+            overdue = time.perf_counter() - deadline
+            if overdue < self.slow or (self._pending and self._pending["_deadline"] == deadline):
+                continue
+            frame = sys._current_frames().get(self._loop_tid)
+            frames = traceback.extract_stack(frame) if frame is not None else []
+            del frame
+            # Caught inside our own gc callback: the stall is a collection triggered by the frame below
+            in_gc = bool(frames) and frames[-1].name == "_on_gc" and frames[-1].filename == __file__
+            if in_gc:
+                frames.pop()
+            self._pending = {
+                "_deadline": deadline,
+                "time": time.time(),
+                "blocked_ms": round(overdue * 1000.0, 1),
+                "in_gc": in_gc,
+                "stack": "".join(frames.format()) if frames else "",
+            }
+            where = f"{frames[-1].name} ({os.path.basename(frames[-1].filename)}:{frames[-1].lineno})" if frames else "?"
+            print(f"🐢 Event loop blocked for >{overdue * 1000.0:.0f} ms in {'GC triggered by ' if in_gc else ''}{where}")
+
+    def _finish_report(self, lag_ms: float, gc_ms: float) -> None:
+        report = self._pending
+        if report is None or report["_deadline"] != self._deadline:
+            report = {"_deadline": self._deadline, "time": time.time(), "stack": ""}
+            self._pending = report
+        report["blocked_ms"] = round(lag_ms, 1)
+        report["gc_ms"] = round(gc_ms, 1)
+        self.slow_count += 1
+        self.reports.append(report)
+
+    # -------- GC pauses --------
+
+    def _on_gc(self, phase: str, info: dict[str, int]) -> None:
+        if phase == "start":
+            self._gc_t0 = time.perf_counter()
+            return
+        ms = (time.perf_counter() - self._gc_t0) * 1000.0
+        st = self.gc_stats[info["generation"]]
+        st["collections"] += 1
+        st["total_ms"] += ms
+        st["max_ms"] = max(st["max_ms"], ms)
+        self._gc_ms += ms
+
+    # -------- reporting --------
+
+    def snapshot(self) -> dict[str, Any]:
+        bounds = [str(b) for b in LAG_BUCKETS_MS] + ["+Inf"]
+        return {
+            "interval_ms": self.interval * 1000.0,
+            "slow_callback_ms": self.slow * 1000.0,
+            "lag_ms": {
+                "count": self.count,
+                "mean": round(self.sum_ms / self.count, 3) if self.count else None,
+                "p50": self._quantile_ms(0.50),
+                "p99": self._quantile_ms(0.99),
+                "max": round(self.max_ms, 3),
+                "buckets": dict(zip(bounds, self.buckets)),
+            },
+            "gc": {
+                str(gen): {k: round(v, 3) for k, v in st.items()} for gen, st in self.gc_stats.items()
+            },
+            "slow_callbacks": {
+                "count": self.slow_count,
+                "recent": [{k: v for k, v in r.items() if not k.startswith("_")} for r in self.reports],
+            },
+        }
+
+    # -------- sampling profiler --------
+
+    def profile(self, seconds: float, hz: float, loop_only: bool) -> str:
+        """Sample thread stacks for `seconds`; blocking, run it in an executor."""
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        counts: Counter[str] = Counter()
+        period = 1.0 / hz
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            for tid, frame in sys._current_frames().items():
+                if tid == me or (loop_only and tid != self._loop_tid):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if not loop_only:
+                    stack.append(names.get(tid, f"thread-{tid}").replace(";", ":").replace(" ", "_"))
+                counts[";".join(reversed(stack))] += 1
+            time.sleep(period)
+        return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+def install(app: Quart) -> Optional[LoopMonitor]:
+    """Start the monitor with the app's event loop and add the /admin routes.
+    PROXY_LOOP_MONITOR=0 disables everything."""
+    if os.environ.get("PROXY_LOOP_MONITOR", "1") == "0":
+        return None
+    monitor = LoopMonitor(
+        interval_ms=_env_float("PROXY_LAG_INTERVAL_MS", 50.0),
+        slow_ms=_env_float("PROXY_SLOW_CALLBACK_MS", 100.0),
+    )
+    token = os.environ.get("PROXY_ADMIN_TOKEN")
+
+    def _authorized() -> bool:
+        if token:
+            return request.headers.get("Authorization") == f"Bearer {token}"
+        return request.remote_addr in LOOPBACK
+
+    @app.before_serving
+    async def _start_loop_monitor():
+        monitor.start()
+
+    @app.after_serving
+    async def _stop_loop_monitor():
+        await monitor.stop()
+
+    @app.route("/admin/loop_lag", methods=["GET"])
+    async def loop_lag():
+        if not _authorized():
+            return {"error": "unauthorized"}, 401
+        return monitor.snapshot()
+
+    @app.route("/admin/profile", methods=["GET", "POST"])
+    async def profile():
+        if not _authorized():
+            return {"error": "unauthorized"}, 401
+        try:
+            seconds = min(float(request.args.get("seconds", 10)), MAX_PROFILE_SECONDS)
+            hz = min(max(float(request.args.get("hz", 100)), 1.0), MAX_PROFILE_HZ)
+        except ValueError:
+            return {"error": "seconds and hz must be numbers"}, 400
+        threads = request.args.get("threads", "loop")
+        if threads not in ("loop", "all"):
+            return {"error": "threads must be 'loop' or 'all'"}, 400
+        if not monitor._profiling.acquire(blocking=False):
+            return {"error": "a profile is already running"}, 409
+        try:
+            collapsed = await asyncio.get_running_loop().run_in_executor(
+                None, monitor.profile, seconds, hz, threads == "loop"
+            )
+        finally:
+            monitor._profiling.release()
+        return collapsed, 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+    return monitor
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# scripts/analyze_cost_agg_disagg.py
+# Cost-normalized agg vs disagg comparison. Throughput is divided by the number of GPUs each
+# mode occupies (agg = 1 GPU, disagg = PROD_GPU + CONS_GPU = 2 by default), so both modes are
+# compared at equal hardware cost.
+#
+# For every (model, prompt_tokens, max_tokens) point of the sweep:
+#   - Pareto frontier per mode over all swept concurrencies: throughput/GPU (higher) vs TTFT (lower)
+#   - best throughput/GPU on that frontier whose TTFT meets --ttft-slo (no SLO = peak throughput/GPU)
+#   - winner = mode with the higher best throughput/GPU; "tie" within --tie-tol
+# Adjacent grid points with different winners are reported as crossover boundaries.
+#
+# Outputs (in --output):
+#   cost_pareto_<tag>.png          frontiers, one panel per (prompt_tokens, max_tokens)
+#   cost_crossover_<tag>.png       disagg/agg throughput-per-GPU ratio over (prompt_tokens, max_tokens)
+#   cost_pareto_points_<tag>.csv   every point with throughput/GPU and an on_frontier flag
+#   cost_recommendation_<tag>.csv  one row per (model, pt, mt): winner + per-mode numbers
+#   cost_recommendation_<tag>.json same table + boundaries, for a router (nearest grid point lookup)
+#
+# Examples:
+#   python3 scripts/analyze_cost_agg_disagg.py
+#   python3 scripts/analyze_cost_agg_disagg.py --ttft-metric p95_ttft --ttft-slo 0.5
+#   python3 scripts/analyze_cost_agg_disagg.py --layout setup/layouts/2p2d.json   # disagg GPUs from a layout
+
+import argparse, json, math, os, sys
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from bench_dataset import FigureManifest, load_runs, resolve_glob, slice_digest
+
+MODES = ["agg", "disagg"]
+GRID = ["prompt_tokens", "max_tokens"]
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Cost-normalized agg vs disagg: Pareto frontiers + recommendation table.")
+    p.add_argument("--input", default="results/bench_runs", help="Input dir or glob for CSVs")
+    p.add_argument("--output", default="results/figures", help="Output dir for figures and tables")
+    p.add_argument("--model", type=str, help="Optional model_tag filter")
+    p.add_argument("--gpus", nargs="*", default=[], metavar="MODE=N",
+                   help="GPUs per mode (default: agg=1 disagg=2, i.e. PROD_GPU + CONS_GPU)")
+    p.add_argument("--layout", help="launch_cluster.py layout JSON; disagg GPUs = distinct GPUs it uses")
+    p.add_argument("--thr-metric", choices=["aggregate_throughput", "steady_throughput"],
+                   default="aggregate_throughput", help="System throughput column (tokens/s)")
+    p.add_argument("--ttft-metric", choices=["p50_ttft", "p95_ttft"], default="p50_ttft")
+    p.add_argument("--ttft-slo", type=float, default=None,
+                   help="TTFT SLO in seconds; only frontier points meeting it count (default: none)")
+    p.add_argument("--tie-tol", type=float, default=0.05,
+                   help="Relative throughput/GPU difference below which the result is a tie")
+    p.add_argument("--force", action="store_true", help="Re-render even if the input slice is unchanged")
+    return p.parse_args()
+
+def gpus_per_mode(a):
+    gpus = {"agg": 1, "disagg": 2}
+    if a.layout:
+        with open(a.layout) as f:
+            layout = json.load(f)
+        gpus["disagg"] = len({str(g) for role in ("prefill", "decode") for g in layout[role]["gpus"]})
+    for item in a.gpus:
+        mode, _, n = item.partition("=")
+        if mode not in MODES or not n.isdigit() or int(n) < 1:
+            sys.exit(f"Bad --gpus entry '{item}' (expected MODE=N, MODE in {MODES})")
+        gpus[mode] = int(n)
+    return gpus
+
+def load_points(a, gpus):
+    df = load_runs(resolve_glob(a.input), os.path.join(a.output, ".runs_cache.pkl"))
+    if df.empty: sys.exit(f"No CSV files found in {a.input}")
+    df = df[df["mode"].isin(MODES)]
+    if a.model:
+        df = df[df["model_tag"] == a.model]
+    for c in (a.thr_metric, a.ttft_metric):
+        if c not in df.columns: sys.exit(f"Column '{c}' missing from the run CSVs")
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    df = df.dropna(subset=[a.thr_metric, a.ttft_metric])
+    if df.empty: sys.exit(f"No runs with both {a.thr_metric} and {a.ttft_metric}")
+
+    # Repeated runs of the same point are averaged
+    keys = ["mode", "model_tag", *GRID, "concurrency"]
+    df = df.groupby(keys, as_index=False)[[a.thr_metric, a.ttft_metric]].mean()
+    df = df.rename(columns={a.thr_metric: "throughput", a.ttft_metric: "ttft"})
+    df["gpus"] = df["mode"].map(gpus)
+    df["thr_per_gpu"] = df["throughput"] / df["gpus"]
+    df["on_frontier"] = False
+    for _, g in df.groupby(["mode", "model_tag", *GRID]):
+        df.loc[pareto_index(g), "on_frontier"] = True
+    return df.sort_values(keys).reset_index(drop=True)
+
+def pareto_index(g):
+    """Index of the non-dominated rows (lower ttft, higher thr_per_gpu)."""
+    best, out = -math.inf, []
+    for idx, r in g.sort_values(["ttft", "thr_per_gpu"], ascending=[True, False]).iterrows():
+        if r["thr_per_gpu"] > best:
+            out.append(idx)
+            best = r["thr_per_gpu"]
+    return out
+
+def best_point(front, slo):
+    """Highest-throughput/GPU frontier point meeting the SLO; else the lowest-TTFT one (feasible=False)."""
+    ok = front if slo is None else front[front["ttft"] <= slo]
+    if not ok.empty:
+        return ok.loc[ok["thr_per_gpu"].idxmax()], True
+    return front.loc[front["ttft"].idxmin()], False
+
+def recommend(df, slo, tie_tol):
+    rows = []
+    for (model, pt, mt), g in df[df["on_frontier"]].groupby(["model_tag", *GRID]):
+        row = {"model_tag": model, "prompt_tokens": int(pt), "max_tokens": int(mt)}
+        best = {}
+        for mode in MODES:
+            front = g[g["mode"] == mode]
+            if front.empty:
+                continue
+            r, feasible = best_point(front, slo)
+            best[mode] = (r, feasible)
+            row.update({f"{mode}_thr_per_gpu": round(r["thr_per_gpu"], 3), f"{mode}_ttft": round(r["ttft"], 4),
+                        f"{mode}_concurrency": int(r["concurrency"]), f"{mode}_meets_slo": feasible})
+        if len(best) < 2:
+            # Not a comparison: the other mode has no data here
+            row.update({"recommend": f"only_{next(iter(best))}", "ratio_disagg_over_agg": None})
+            rows.append(row)
+            continue
+        (ra, fa), (rd, fd) = best["agg"], best["disagg"]
+        ratio = rd["thr_per_gpu"] / ra["thr_per_gpu"] if ra["thr_per_gpu"] else math.inf
+        if fa != fd:
+            winner = "agg" if fa else "disagg"
+        elif not fa:
+            winner = "agg" if ra["ttft"] <= rd["ttft"] else "disagg"  # nobody meets the SLO: lower TTFT wins
+        elif abs(ratio - 1.0) <= tie_tol:
+            winner = "tie"
+        else:
+            winner = "disagg" if ratio > 1.0 else "agg"
+        row.update({"recommend": winner, "ratio_disagg_over_agg": round(ratio, 4)})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+def boundaries(rec):
+    """Neighbouring grid points (along prompt_tokens or max_tokens) whose recommendation differs.
+    Points measured in one mode only are skipped, so missing data never shows up as a crossover."""
+    out = []
+    for model, g in rec.groupby("model_tag"):
+        win = {(r["prompt_tokens"], r["max_tokens"]): r["recommend"] for _, r in g.iterrows()
+               if not r["recommend"].startswith("only_")}
+        for axis, other in ((0, "max_tokens"), (1, "prompt_tokens")):
+            lines = {}
+            for k in win:
+                lines.setdefault(k[1 - axis], []).append(k)
+            for fixed, pts in sorted(lines.items()):
+                pts.sort(key=lambda k: k[axis])
+                for lo, hi in zip(pts, pts[1:]):
+                    if win[lo] != win[hi]:
+                        out.append({"model_tag": model, "along": GRID[axis], other: fixed,
+                                    "from": lo[axis], "to": hi[axis], "below": win[lo], "above": win[hi]})
+    return out
+
+def plot_pareto(df, path, slo, gpus, ttft_metric):
+    pts = sorted(df["prompt_tokens"].unique()); mts = sorted(df["max_tokens"].unique())
+    fig, axes = plt.subplots(len(pts), len(mts), figsize=(4 * len(mts), 3.2 * len(pts)), squeeze=False)
+    colors = {"agg": "tab:blue", "disagg": "tab:orange"}
+    for i, pt in enumerate(pts):
+        for j, mt in enumerate(mts):
+            ax = axes[i][j]
+            cell = df[(df["prompt_tokens"] == pt) & (df["max_tokens"] == mt)]
+            for (mode, model), g in cell.groupby(["mode", "model_tag"]):
+                ax.scatter(g["ttft"], g["thr_per_gpu"], color=colors[mode], alpha=0.35, s=14)
+                f = g[g["on_frontier"]].sort_values("ttft")
+                ax.plot(f["ttft"], f["thr_per_gpu"], marker="o", color=colors[mode],
+                        label=f"{mode} ({gpus[mode]} GPU)" + (f" {model}" if cell["model_tag"].nunique() > 1 else ""))
+                for _, r in f.iterrows():
+                    ax.annotate(str(int(r["concurrency"])), (r["ttft"], r["thr_per_gpu"]),
+                                fontsize=7, xytext=(3, 3), textcoords="offset points")
+            if slo is not None:
+                ax.axvline(slo, color="grey", linestyle="--", linewidth=1)
+            ax.set_title(f"pt={pt}, mt={mt}", fontsize=9); ax.grid(True)
+            if i == len(pts) - 1: ax.set_xlabel(f"{ttft_metric} (s)")
+            if j == 0: ax.set_ylabel("tokens/s per GPU")
+            if not cell.empty: ax.legend(fontsize=7)
+    fig.suptitle("Throughput per GPU vs TTFT — Pareto frontier over concurrency (labels)")
+    fig.tight_layout(); fig.savefig(path); plt.close(fig)
+
+def plot_crossover(rec, path):
+    models = sorted(rec["model_tag"].unique())
+    fig, axes = plt.subplots(1, len(models), figsize=(6 * len(models), 5), squeeze=False)
+    for ax, model in zip(axes[0], models):
+        g = rec[rec["model_tag"] == model]
+        pts = sorted(g["prompt_tokens"].unique()); mts = sorted(g["max_tokens"].unique())
+        grid = [[math.nan] * len(mts) for _ in pts]
+        labels = {}
+        for _, r in g.iterrows():
+            i, j = pts.index(r["prompt_tokens"]), mts.index(r["max_tokens"])
+            if pd.notna(r["ratio_disagg_over_agg"]) and r["ratio_disagg_over_agg"] > 0:
+                grid[i][j] = math.log2(r["ratio_disagg_over_agg"])
+            slo_decided = pd.notna(r["ratio_disagg_over_agg"]) and r["agg_meets_slo"] != r["disagg_meets_slo"]
+            labels[(i, j)] = (f"{r['recommend']}{'*' if slo_decided else ''}\n{r['ratio_disagg_over_agg']:.2f}x"
+                              if pd.notna(r["ratio_disagg_over_agg"]) else r["recommend"])
+        lim = max([abs(v) for row in grid for v in row if not math.isnan(v)] or [1.0]) or 1.0
+        im = ax.imshow(grid, cmap="coolwarm", vmin=-lim, vmax=lim, origin="lower", aspect="auto")
+        for (i, j), s in labels.items():
+            ax.text(j, i, s, ha="center", va="center", fontsize=8)
+        ax.set_xticks(range(len(mts))); ax.set_xticklabels(mts)
+        ax.set_yticks(range(len(pts))); ax.set_yticklabels(pts)
+        ax.set_xlabel("Max tokens (mt)"); ax.set_ylabel("Prompt tokens (pt)"); ax.set_title(model, fontsize=9)
+        fig.colorbar(im, ax=ax, label="log2(disagg / agg) tokens/s per GPU")
+    fig.suptitle("Equal-cost throughput/GPU (red = disagg, blue = agg; * = other mode misses the TTFT SLO)")
+    fig.tight_layout(); fig.savefig(path); plt.close(fig)
+
+def main():
+    a = parse_args()
+    gpus = gpus_per_mode(a)
+    os.makedirs(a.output, exist_ok=True)
+    df = load_points(a, gpus)
+
+    tag = a.ttft_metric + (f"_slo{a.ttft_slo:g}" if a.ttft_slo is not None else "")
+    out = lambda name, ext: os.path.join(a.output, f"cost_{name}_{tag}.{ext}")
+    pareto_png, cross_png = out("pareto", "png"), out("crossover", "png")
+    points_csv, rec_csv, rec_json = out("pareto_points", "csv"), out("recommendation", "csv"), out("recommendation", "json")
+
+    manifest = FigureManifest(a.output)
+    digest = slice_digest(df, f"{a.thr_metric}|{a.ttft_metric}|{a.ttft_slo}|{a.tie_tol}|{sorted(gpus.items())}|{a.model}")
+    if not a.force and manifest.is_fresh(pareto_png, digest) and os.path.exists(rec_json):
+        print(f"[OK] Unchanged, skipped: {pareto_png}")
+        return
+
+    rec = recommend(df, a.ttft_slo, a.tie_tol)
+    bounds = boundaries(rec)
+
+    df.to_csv(points_csv, index=False)
+    rec.to_csv(rec_csv, index=False)
+    with open(rec_json, "w", encoding="utf-8") as f:
+        json.dump({
+            "gpus": gpus, "throughput_metric": a.thr_metric, "ttft_metric": a.ttft_metric,
+            "ttft_slo": a.ttft_slo, "tie_tol": a.tie_tol,
+            "lookup": "nearest (prompt_tokens, max_tokens) grid point in log2 space, per model_tag",
+            "rules": json.loads(rec.to_json(orient="records")),
+            "boundaries": bounds,
+        }, f, indent=1)
+    plot_pareto(df, pareto_png, a.ttft_slo, gpus, a.ttft_metric)
+    plot_crossover(rec, cross_png)
+
+    print(f"[INFO] GPUs per mode: {gpus}; throughput={a.thr_metric}/GPU, latency={a.ttft_metric}, "
+          f"SLO={a.ttft_slo if a.ttft_slo is not None else 'none'}")
+    for _, r in rec.iterrows():
+        ratio = r["ratio_disagg_over_agg"]
+        print(f"  {r['model_tag']} pt={r['prompt_tokens']:>6} mt={r['max_tokens']:>6} -> {r['recommend']:<11}"
+              + (f" (disagg/agg per GPU = {ratio:.2f}x)" if pd.notna(ratio) else ""))
+    for b in bounds:
+        other = "max_tokens" if b["along"] == "prompt_tokens" else "prompt_tokens"
+        print(f"[CROSSOVER] {b['model_tag']} {other}={b[other]}: {b['along']} {b['from']}→{b['to']} "
+              f"switches {b['below']} → {b['above']}")
+    for path in (pareto_png, cross_png, points_csv, rec_csv, rec_json):
+        print(f"[OK] Saved: {path}")
+    manifest.update(pareto_png, digest)
+    manifest.save()
+
+if __name__ == "__main__":
+    main()
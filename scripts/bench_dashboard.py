@@ -0,0 +1,129 @@
+# scripts/bench_dashboard.py
+#!/usr/bin/env python3
+"""
+bench_dashboard.py
+Self-contained HTML dashboard (no network / CDN needed) over the merged run table.
+One page replaces the per-(mode, pt) and per-(mode, conc) PNGs: pick the view,
+mode, model and fixed value, and the chart is drawn client-side as SVG.
+"""
+
+import json
+import math
+
+DASH_COLS = [
+    "mode", "model_tag", "concurrency", "prompt_tokens", "max_tokens",
+    "mean_tps", "p50_ttft", "p95_ttft", "aggregate_throughput", "steady_throughput",
+    "mean_tps_lo", "mean_tps_hi", "p50_ttft_lo", "p50_ttft_hi",
+]
+
+_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>vLLM PD benchmark dashboard</title>
+<style>
+ body{font-family:sans-serif;margin:20px;color:#222}
+ label{margin-right:14px} select{margin-left:4px}
+ svg{border:1px solid #ccc;background:#fff;margin-top:12px}
+ .axis text{font-size:11px} .legend text{font-size:12px}
+ table{border-collapse:collapse;margin-top:16px;font-size:12px}
+ td,th{border:1px solid #ddd;padding:2px 6px;text-align:right}
+</style></head><body>
+<h2>vLLM PD benchmark dashboard</h2>
+<div>
+ <label>View<select id="view">
+  <option value="thr">Throughput vs Concurrency (fixed pt)</option>
+  <option value="ttft">TTFT vs Prompt tokens (fixed conc)</option>
+ </select></label>
+ <label>Metric<select id="metric"></select></label>
+ <label>Mode<select id="mode"></select></label>
+ <label>Model<select id="model"></select></label>
+ <label id="fixlabel">Fixed<select id="fixed"></select></label>
+</div>
+<svg id="chart" width="860" height="480"></svg>
+<table id="tbl"></table>
+<script>
+const DATA = __DATA__;
+const VIEWS = {
+  thr:  {x:"concurrency",   fix:"prompt_tokens", metrics:["mean_tps","aggregate_throughput","steady_throughput"]},
+  ttft: {x:"prompt_tokens", fix:"concurrency",   metrics:["p50_ttft","p95_ttft"]},
+};
+const COLORS = ["#1f77b4","#ff7f0e","#2ca02c","#d62728","#9467bd","#8c564b","#e377c2","#7f7f7f"];
+const $ = id => document.getElementById(id);
+const uniq = a => [...new Set(a)].filter(v => v !== null).sort((x,y) => x < y ? -1 : x > y ? 1 : 0);
+function fill(sel, vals, keep){
+  const prev = sel.value;
+  sel.innerHTML = vals.map(v => `<option value="${v}">${v}</option>`).join("");
+  if (keep && vals.map(String).includes(prev)) sel.value = prev;
+}
+function refresh(){
+  const v = VIEWS[$("view").value];
+  fill($("metric"), v.metrics, true);
+  fill($("mode"), uniq(DATA.map(r => r.mode)), true);
+  fill($("model"), uniq(DATA.map(r => r.model_tag)), true);
+  const rows = DATA.filter(r => r.mode === $("mode").value && r.model_tag === $("model").value);
+  $("fixlabel").firstChild.textContent = v.fix;
+  fill($("fixed"), uniq(rows.map(r => r[v.fix])), true);
+  draw();
+}
+function draw(){
+  const v = VIEWS[$("view").value], metric = $("metric").value;
+  const rows = DATA.filter(r => r.mode === $("mode").value && r.model_tag === $("model").value
+                             && String(r[v.fix]) === $("fixed").value && r[metric] !== null && r[v.x] !== null);
+  const svg = $("chart"), W = +svg.getAttribute("width"), H = +svg.getAttribute("height");
+  const m = {l:70, r:140, t:20, b:45}, pw = W - m.l - m.r, ph = H - m.t - m.b;
+  let s = "";
+  if (!rows.length){ svg.innerHTML = `<text x="${W/2}" y="${H/2}" text-anchor="middle">no data</text>`; $("tbl").innerHTML=""; return; }
+  const lo = metric + "_lo", hi = metric + "_hi";
+  const xs = uniq(rows.map(r => r[v.x]));
+  const ymax = Math.max(...rows.map(r => Math.max(r[metric], r[hi] ?? -Infinity))) * 1.05 || 1;
+  const xlog = xs.length > 1 && xs[0] > 0;
+  const fx = x => m.l + (xs.length === 1 ? pw/2 : (xlog ? (Math.log2(x) - Math.log2(xs[0])) / (Math.log2(xs[xs.length-1]) - Math.log2(xs[0]))
+                                                       : (x - xs[0]) / (xs[xs.length-1] - xs[0])) * pw);
+  const fy = y => m.t + ph - (y / ymax) * ph;
+  s += `<g class="axis"><line x1="${m.l}" y1="${m.t+ph}" x2="${m.l+pw}" y2="${m.t+ph}" stroke="#000"/>`
+     + `<line x1="${m.l}" y1="${m.t}" x2="${m.l}" y2="${m.t+ph}" stroke="#000"/>`;
+  xs.forEach(x => s += `<text x="${fx(x)}" y="${m.t+ph+16}" text-anchor="middle">${x}</text>`);
+  for (let i = 0; i <= 5; i++){ const y = ymax*i/5;
+    s += `<line x1="${m.l}" x2="${m.l+pw}" y1="${fy(y)}" y2="${fy(y)}" stroke="#eee"/>`
+       + `<text x="${m.l-6}" y="${fy(y)+4}" text-anchor="end">${y.toPrecision(3)}</text>`; }
+  s += `<text x="${m.l+pw/2}" y="${H-8}" text-anchor="middle">${v.x}</text>`
+     + `<text transform="translate(16,${m.t+ph/2}) rotate(-90)" text-anchor="middle">${metric}</text></g>`;
+  uniq(rows.map(r => r.max_tokens)).forEach((mt, i) => {
+    const line = rows.filter(r => r.max_tokens === mt).sort((a,b) => a[v.x] - b[v.x]);
+    const c = COLORS[i % COLORS.length];
+    const band = line.filter(r => r[lo] !== null && r[hi] !== null && r[lo] !== undefined);
+    if (band.length === line.length && band.length > 1)
+      s += `<polygon fill="${c}" fill-opacity="0.15" points="${band.map(r => fx(r[v.x])+","+fy(r[hi])).join(" ")} ${band.slice().reverse().map(r => fx(r[v.x])+","+fy(r[lo])).join(" ")}"/>`;
+    s += `<polyline fill="none" stroke="${c}" stroke-width="2" points="${line.map(r => fx(r[v.x])+","+fy(r[metric])).join(" ")}"/>`;
+    line.forEach(r => s += `<circle cx="${fx(r[v.x])}" cy="${fy(r[metric])}" r="3" fill="${c}"><title>${v.x}=${r[v.x]} ${metric}=${r[metric]}</title></circle>`);
+    s += `<g class="legend"><rect x="${W-m.r+15}" y="${m.t+i*18}" width="12" height="12" fill="${c}"/>`
+       + `<text x="${W-m.r+32}" y="${m.t+i*18+10}">mt=${mt}</text></g>`;
+  });
+  svg.innerHTML = s;
+  const cols = ["max_tokens", v.x, metric];
+  $("tbl").innerHTML = "<tr>" + cols.map(c => `<th>${c}</th>`).join("") + "</tr>"
+    + rows.sort((a,b) => a.max_tokens - b.max_tokens || a[v.x] - b[v.x])
+          .map(r => "<tr>" + cols.map(c => `<td>${r[c]}</td>`).join("") + "</tr>").join("");
+}
+["view","mode","model"].forEach(id => $(id).addEventListener("change", refresh));
+["metric","fixed"].forEach(id => $(id).addEventListener("change", draw));
+refresh();
+</script></body></html>
+"""
+
+
+def _clean(v):
+    if isinstance(v, float) and math.isnan(v):
+        return None
+    if hasattr(v, "item"):  # numpy scalar -> python
+        v = v.item()
+        if isinstance(v, float) and math.isnan(v):
+            return None
+    return v
+
+
+def write_dashboard(df, path: str):
+    cols = [c for c in DASH_COLS if c in df.columns]
+    rows = [{c: _clean(r[c]) for c in cols} for r in df[cols].to_dict("records")]
+    html = _TEMPLATE.replace("__DATA__", json.dumps(rows).replace("</", "<\\/"))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+    return path
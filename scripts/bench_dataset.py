@@ -0,0 +1,159 @@
+# scripts/bench_dataset.py
+#!/usr/bin/env python3
+"""
+bench_dataset.py
+Cached, incrementally updated merged table of run_*.csv files, plus a small
+manifest used to skip re-rendering figures whose input slice has not changed.
+
+The cache remembers (mtime_ns, size) per CSV; only new or changed files are
+re-read, and rows of deleted files are dropped.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import pickle
+
+import pandas as pd
+
+from bench_utils import metadata_from_filename
+
+KEY_COLS = ["mode", "model_tag", "concurrency", "prompt_tokens", "max_tokens"]
+NUMERIC_COLS = ["concurrency", "prompt_tokens", "max_tokens", "mean_tps", "p50_ttft"]
+CACHE_VERSION = 2  # 2: cache keys are absolute paths
+
+
+def resolve_glob(input_arg: str) -> str:
+    """Directory -> <dir>/run_*.csv; anything else is used as a glob as-is."""
+    if os.path.isdir(input_arg):
+        return os.path.join(input_arg, "run_*.csv")
+    return input_arg
+
+
+def read_run_csv(path: str) -> pd.DataFrame:
+    """Read one run CSV and fill missing metadata from the filename."""
+    df = pd.read_csv(path)
+
+    # Prefer embedded metadata; otherwise derive from filename
+    meta = {}
+    for k in KEY_COLS:
+        v = df[k].iloc[0] if k in df.columns and len(df) and pd.notna(df[k].iloc[0]) else None
+        if v is not None and k in ("concurrency", "prompt_tokens", "max_tokens"):
+            v = int(v)
+        meta[k] = v
+    if any(v is None for v in meta.values()):
+        for k, v in metadata_from_filename(path).items():
+            if meta.get(k) is None:
+                meta[k] = v
+    if meta.get("mode") is None:
+        meta["mode"] = "unknown"
+    if meta.get("model_tag") is None:
+        meta["model_tag"] = "unknown"
+    for k, v in meta.items():
+        df[k] = v
+
+    # Backward-compat column name
+    if "mean_tps" not in df.columns and "mean_tokens_per_sec" in df.columns:
+        df["mean_tps"] = df["mean_tokens_per_sec"]
+
+    df["_source"] = path
+    return df
+
+
+def _stamp(path: str):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def load_runs(csv_glob: str, cache_path: str = None) -> pd.DataFrame:
+    """Merged, de-duplicated table of all run CSVs matching `csv_glob`.
+    With `cache_path`, unchanged files are served from the cache. Paths are made absolute, so
+    scripts passing the same directory as relative or absolute paths share cache entries.
+    Returns an empty DataFrame if nothing matched.
+    """
+    paths = sorted(os.path.abspath(p) for p in glob.glob(csv_glob))
+
+    cached_files, cached_df = {}, None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                blob = pickle.load(f)
+            if blob.get("version") == CACHE_VERSION:
+                cached_files, cached_df = blob["files"], blob["df"]
+        except Exception:
+            # Corrupt or incompatible cache: rebuild from scratch.
+            cached_files, cached_df = {}, None
+
+    stamps = {p: _stamp(p) for p in paths}
+    fresh = [p for p in paths if cached_files.get(p) != stamps[p]]
+    keep = {p for p in paths if p not in fresh}
+
+    frames = []
+    if cached_df is not None and keep:
+        frames.append(cached_df[cached_df["_source"].isin(keep)])
+    n_read = 0
+    for path in fresh:
+        try:
+            frames.append(read_run_csv(path))
+            n_read += 1
+        except Exception as e:
+            print(f"[WARN] Skipping unreadable CSV {path}: {e}")
+            stamps.pop(path, None)
+
+    if frames:
+        df = pd.concat(frames, ignore_index=True)
+    else:
+        df = pd.DataFrame(columns=KEY_COLS + ["_source"])
+
+    if cache_path and (fresh or set(cached_files) != set(stamps)):
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        tmp = cache_path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": CACHE_VERSION, "files": stamps, "df": df}, f)
+        os.replace(tmp, cache_path)
+    if cache_path:
+        print(f"[INFO] Runs: {len(paths)} total, {n_read} (re)read, {len(keep)} from cache")
+
+    # Coerce numeric types for grouping/plotting
+    for c in NUMERIC_COLS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+
+    # Drop exact duplicates on the key experiment dimensions (latest file wins)
+    df = df.sort_values("_source", kind="stable")
+    df = df.drop_duplicates(subset=KEY_COLS, keep="last").reset_index(drop=True)
+    return df
+
+
+def slice_digest(df: pd.DataFrame, extra: str = "") -> str:
+    """Stable digest of a data slice (plus any render parameters in `extra`)."""
+    h = hashlib.sha1(df.to_csv(index=False).encode("utf-8"))
+    h.update(extra.encode("utf-8"))
+    return h.hexdigest()
+
+
+class FigureManifest:
+    """Maps output file -> digest of the slice it was rendered from."""
+
+    def __init__(self, out_dir: str, name: str = ".figures_manifest.json"):
+        self.path = os.path.join(out_dir, name)
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self.entries = {}
+
+    def is_fresh(self, out_path: str, digest: str) -> bool:
+        return self.entries.get(out_path) == digest and os.path.exists(out_path)
+
+    def update(self, out_path: str, digest: str):
+        self.entries[out_path] = digest
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
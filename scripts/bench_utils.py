@@ -12,6 +12,14 @@ FNAME_META = re.compile(
     r"run_(?P<mode>agg|disagg)_model_(?P<modeltag>.+?)_conc(?P<conc>\d+)_pt(?P<pt>\d+)_mt(?P<mt>\d+)\.(?:csv|log)$"
 )
 
+def model_tag_for(model: str) -> str:
+    """Filesystem-safe model tag ('/' and ':' replaced by '_'), as used in run filenames."""
+    return model.replace("/", "_").replace(":", "_")
+
+def run_id_for(mode: str, model_tag: str, conc: int, pt: int, mt: int) -> str:
+    """RUN_ID used in run_<RUN_ID>.log / .csv filenames (parsed back by FNAME_META)."""
+    return f"{mode}_model_{model_tag}_conc{conc}_pt{pt}_mt{mt}"
+
 def metadata_from_filename(path: str):
     """Extract (mode, model_tag, conc, pt, mt) from the standardized filename.
     Falls back to best-effort parsing for legacy names.
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# scripts/check_regression.py
+# --------------------------------
+# Performance regression gate: compare a candidate run set against a stored baseline
+# (both are run_*.csv files from collect_from_log.py / sweep_bench.py).
+#
+# Points are matched on (mode, model_tag, concurrency, prompt_tokens, max_tokens).
+# For each metric the relative delta is checked against a tolerance, and a delta only
+# counts as a regression/improvement if it is also distinguishable from noise:
+#   - several runs per point on either side (pass several dirs/globs) -> two-sample t interval on
+#     the delta, from the run-to-run variance (method=t). This is the only method that sees the
+#     variation between separate runs, so store the baseline as several runs.
+#   - single runs carrying bootstrap CIs (bench_pd.py --trials) -> CI on the delta from both
+#     half-widths (method=ci); these only reflect the spread between trials inside one run
+#   - single runs without CIs -> the tolerance alone decides (reported as method=threshold)
+# With --confirm (a fresh re-run of the candidate), a regression only fails the gate if it shows up
+# at the same point/metric in the re-run too; otherwise it is reported as "unconfirmed". This absorbs
+# a slow window of a shared host, which no interval on one run can tell apart from a real regression.
+# Points whose baseline and candidate were measured with different requests, trials or
+# warmup_requests are reported and make the gate exit 2 (--allow-mismatch compares them anyway).
+#
+# Exit code: 0 = pass, 1 = regression (or missing points with --fail-on-missing),
+#            2 = usage error or configuration mismatch.
+#
+# Examples:
+#   python3 scripts/check_regression.py --baseline results/baseline --candidate results/bench_runs
+#   python3 scripts/check_regression.py --baseline base_a base_b base_c --candidate cand \
+#       --tol p95_ttft=0.2 --report results/regression.md
+#
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+
+import pandas as pd
+
+from bench_dataset import KEY_COLS, load_runs, resolve_glob
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+from bench_stats import mean, t_quantile  # noqa: E402
+
+# metric -> (higher_is_better, default relative tolerance)
+METRICS = {
+    "p50_ttft": (False, 0.10),
+    "p95_ttft": (False, 0.15),
+    "mean_tps": (True, 0.05),
+    "aggregate_throughput": (True, 0.05),
+}
+# Measurement settings that must agree for a point to be comparable
+CONFIG_COLS = ["requests", "trials", "warmup_requests"]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Gate a candidate benchmark run set against a baseline.")
+    p.add_argument("--baseline", nargs="+", required=True,
+                   help="Baseline run set(s): dirs or globs of run_*.csv (several = repeated runs)")
+    p.add_argument("--candidate", nargs="+", required=True,
+                   help="Candidate run set(s): dirs or globs of run_*.csv (several = repeated runs)")
+    p.add_argument("--confirm", nargs="+", default=None,
+                   help="Re-run(s) of the candidate: a regression must also show against these to count")
+    p.add_argument("--metrics", nargs="+", choices=list(METRICS), default=list(METRICS))
+    p.add_argument("--tol", nargs="*", default=[], metavar="METRIC=REL",
+                   help="Override relative tolerances, e.g. p95_ttft=0.2 mean_tps=0.03")
+    p.add_argument("--alpha", type=float, default=0.05, help="Significance level of the t interval")
+    p.add_argument("--fail-on-missing", action="store_true",
+                   help="Fail if a baseline point has no candidate counterpart")
+    p.add_argument("--allow-mismatch", action="store_true",
+                   help="Only warn when baseline and candidate differ in requests/trials/warmup_requests")
+    p.add_argument("--report", default=None, help="Write the report to this .md or .json file")
+    return p.parse_args()
+
+
+def load_sets(inputs):
+    frames = []
+    for i, inp in enumerate(inputs):
+        df = load_runs(resolve_glob(inp))
+        if df.empty:
+            sys.exit(f"No CSV files matched: {inp}")
+        df["_set"] = i
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    for c in df.columns:
+        if c.endswith(("_ttft", "_tps", "_throughput", "_lo", "_hi")) or c in CONFIG_COLS:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df
+
+
+def _values(rows, col):
+    if col not in rows.columns:
+        return []
+    return [float(v) for v in rows[col] if pd.notna(v)]
+
+
+def _ci(rows, metric):
+    lo, hi = _values(rows, f"{metric}_lo"), _values(rows, f"{metric}_hi")
+    if len(rows) == 1 and lo and hi and not (math.isnan(lo[0]) or math.isnan(hi[0])):
+        return lo[0], hi[0]
+    return None
+
+
+def compare_point(base_rows, cand_rows, metric, tol, alpha):
+    higher_better = METRICS[metric][0]
+    b, c = _values(base_rows, metric), _values(cand_rows, metric)
+    if not b or not c:
+        return {"status": "missing", "method": "-", "baseline": mean(b) if b else None,
+                "candidate": mean(c) if c else None, "delta": None, "noise": None}
+
+    mb, mc = mean(b), mean(c)
+    delta = (mc - mb) / mb if mb else float("inf") if mc else 0.0
+    worse = -delta if higher_better else delta
+
+    # Half-width of the (1 - alpha) interval on mc - mb, or None if there is no noise estimate
+    half = None
+    df = len(b) + len(c) - 2
+    if df >= 1:
+        method = "t"
+        pooled = sum((len(xs) - 1) * statistics.variance(xs) for xs in (b, c) if len(xs) >= 2) / df
+        half = t_quantile(1 - alpha / 2, df) * math.sqrt(pooled * (1 / len(b) + 1 / len(c)))
+    elif _ci(base_rows, metric) and _ci(cand_rows, metric):
+        method = "ci"
+        (bl, bh), (cl, ch) = _ci(base_rows, metric), _ci(cand_rows, metric)
+        half = math.hypot((bh - bl) / 2, (ch - cl) / 2)
+    else:
+        method = "threshold"
+    significant = half is None or abs(mc - mb) > half
+
+    if worse > tol and significant:
+        status = "regressed"
+    elif worse < -tol and significant:
+        status = "improved"
+    else:
+        status = "ok"
+    return {"status": status, "method": method, "baseline": mb, "candidate": mc,
+            "delta": delta, "noise": half / abs(mb) if half is not None and mb else None}
+
+
+def config_mismatches(base_rows, cand_rows):
+    """Settings (CONFIG_COLS) whose values differ between the two sides of a point."""
+    out = {}
+    for col in CONFIG_COLS:
+        b, c = set(_values(base_rows, col)), set(_values(cand_rows, col))
+        if b and c and b != c:
+            out[col] = (sorted(b), sorted(c))
+    return out
+
+
+def run_gate(base_df, cand_df, metrics, tols, alpha):
+    rows, mismatches = [], []
+    cand_groups = {k: g for k, g in cand_df.groupby(KEY_COLS, dropna=False)}
+    for key, base_rows in base_df.groupby(KEY_COLS, dropna=False):
+        cand_rows = cand_groups.get(key, cand_df.iloc[0:0])
+        diff = config_mismatches(base_rows, cand_rows)
+        if diff:
+            mismatches.append({**dict(zip(KEY_COLS, key)), "differs": diff})
+        for metric in metrics:
+            res = compare_point(base_rows, cand_rows, metric, tols[metric], alpha)
+            rows.append({**dict(zip(KEY_COLS, key)), "metric": metric, "tol": tols[metric], **res})
+    return rows, mismatches
+
+
+def _fmt(v, spec):
+    return "-" if v is None or (isinstance(v, float) and math.isnan(v)) else format(v, spec)
+
+
+def render_markdown(rows, passed):
+    lines = [f"# Performance regression gate: {'PASS' if passed else 'FAIL'}", "",
+             "| mode | model | conc | pt | mt | metric | baseline | candidate | delta | tol | method | noise | status |",
+             "|---|---|---|---|---|---|---|---|---|---|---|---|---|"]
+    order = {"regressed": 0, "missing": 1, "unconfirmed": 2, "improved": 3, "ok": 4}
+    for r in sorted(rows, key=lambda r: (order[r["status"]], str(r["mode"]), r["concurrency"] or 0,
+                                         r["prompt_tokens"] or 0, r["max_tokens"] or 0, r["metric"])):
+        lines.append(
+            f"| {r['mode']} | {r['model_tag']} | {r['concurrency']} | {r['prompt_tokens']} | {r['max_tokens']} "
+            f"| {r['metric']} | {_fmt(r['baseline'], '.4g')} | {_fmt(r['candidate'], '.4g')} "
+            f"| {_fmt(r['delta'], '+.1%')} | {r['tol']:.0%} | {r['method']} | {_fmt(r['noise'], '.1%')} "
+            f"| {r['status']} |")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    a = parse_args()
+    tols = {m: METRICS[m][1] for m in METRICS}
+    for item in a.tol:
+        name, _, val = item.partition("=")
+        if name not in METRICS or not val:
+            print(f"Bad --tol entry '{item}' (expected METRIC=REL, METRIC in {list(METRICS)})", file=sys.stderr)
+            sys.exit(2)
+        tols[name] = float(val)
+
+    base_df = load_sets(a.baseline)
+    cand_df = load_sets(a.candidate)
+    rows, mismatches = run_gate(base_df, cand_df, a.metrics, tols, a.alpha)
+    if a.confirm:
+        conf_rows, conf_mismatches = run_gate(base_df, load_sets(a.confirm), a.metrics, tols, a.alpha)
+        mismatches += conf_mismatches
+        point = KEY_COLS + ["metric"]
+        confirmed = {tuple(r[k] for k in point) for r in conf_rows if r["status"] == "regressed"}
+        for r in rows:
+            if r["status"] == "regressed" and tuple(r[k] for k in point) not in confirmed:
+                r["status"] = "unconfirmed"
+
+    counts = {s: sum(r["status"] == s for r in rows)
+              for s in ("regressed", "unconfirmed", "improved", "ok", "missing")}
+    passed = counts["regressed"] == 0 and not (a.fail_on_missing and counts["missing"])
+
+    report = render_markdown(rows, passed)
+    print(report)
+    print(f"[SUMMARY] {'PASS' if passed else 'FAIL'}: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+    for m in mismatches:
+        what = ", ".join(f"{col} baseline={b} candidate={c}" for col, (b, c) in m["differs"].items())
+        print(f"[{'WARN' if a.allow_mismatch else 'ERROR'}] Settings differ at {m['mode']} conc={m['concurrency']} "
+              f"pt={m['prompt_tokens']} mt={m['max_tokens']}: {what}", file=sys.stderr)
+
+    if a.report:
+        os.makedirs(os.path.dirname(os.path.abspath(a.report)), exist_ok=True)
+        with open(a.report, "w", encoding="utf-8") as f:
+            if a.report.endswith(".json"):
+                json.dump({"passed": passed, "counts": counts, "results": rows, "mismatches": mismatches},
+                          f, indent=1, default=str)
+            else:
+                f.write(report)
+        print(f"[OK] Report: {a.report}")
+
+    if mismatches and not a.allow_mismatch:
+        print(f"[ERROR] {len(mismatches)} point(s) measured with different settings; "
+              "re-run with matching REQUESTS/TRIALS/WARMUP or pass --allow-mismatch", file=sys.stderr)
+        sys.exit(2)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -37,6 +37,16 @@ THR_BLOCK_NO_ERRORS = re.compile(
     re.DOTALL
 )
 
+# Optional lines written by newer bench_pd.py (warmup / steady-state / repeated trials)
+WARMUP_LINE = re.compile(r"==\s*Warmup:\s*(?P<n>\d+)\s*requests")
+STEADY_THR = re.compile(r"steady-state throughput\s*=\s*(?P<v>[0-9.]+|nan)")
+STEADY_SAMPLES = re.compile(r"steady-state samples\s*=\s*\d+/\d+(?P<fallback>\s*\(fallback)?")
+MEASURED_LINE = re.compile(r"==\s*Measured:\s*(?P<n>\d+)\s*requests\s*x\s*(?P<trials>\d+)\s*trials")
+CI_BLOCK = re.compile(r"==\s*CI\s*\(bootstrap\s*(?P<level>\d+)%\s*,\s*trials\s*=\s*(?P<trials>\d+)\s*\)\s*==(?P<body>[^\n]*\n[^\n]*)")
+CI_ITEM = re.compile(r"(?P<name>\w+)=\[(?P<lo>[0-9.]+|nan),\s*(?P<hi>[0-9.]+|nan)\]")
+
+CI_METRICS = ["p50_ttft", "p95_ttft", "mean_tps", "aggregate_throughput"]
+
 def parse_log(log_path: str):
     """Parse a single log file and extract benchmark statistics (both agg and disagg)."""
     data = {
@@ -49,6 +59,10 @@ def parse_log(log_path: str):
         # Throughput
         "requests_thr": None, "errors": None, "p50_tps": None, "p95_tps": None, "mean_tps": None,
         "total_tokens": None, "wall_time_sec": None, "aggregate_throughput": None,
+        # Warmup / steady-state / repeated trials
+        "warmup_requests": None, "steady_throughput": None, "trials": None,
+        "requests": None, "steady_fallback": None,
+        **{f"{m}_{b}": None for m in CI_METRICS for b in ("lo", "hi")},
     }
 
     # filename-derived metadata
@@ -81,6 +95,28 @@ def parse_log(log_path: str):
         data["wall_time_sec"] = float(thr.group("wall"))
         data["aggregate_throughput"] = float(thr.group("agg"))
 
+    warm = WARMUP_LINE.search(log)
+    if warm:
+        data["warmup_requests"] = int(warm.group("n"))
+    steady = STEADY_THR.search(log)
+    if steady:
+        data["steady_throughput"] = float(steady.group("v"))
+    samples = list(STEADY_SAMPLES.finditer(log))
+    if samples:
+        # 1 if TTFT or throughput stats fell back to the whole run (window too small)
+        data["steady_fallback"] = int(any(m.group("fallback") for m in samples))
+    measured = MEASURED_LINE.search(log)
+    if measured:
+        data["requests"] = int(measured.group("n"))
+        data["trials"] = int(measured.group("trials"))
+    ci = CI_BLOCK.search(log)
+    if ci:
+        data["trials"] = int(ci.group("trials"))
+        for item in CI_ITEM.finditer(ci.group("body")):
+            if item.group("name") in CI_METRICS:
+                data[f"{item.group('name')}_lo"] = float(item.group("lo"))
+                data[f"{item.group('name')}_hi"] = float(item.group("hi"))
+
     return data
 
 
@@ -94,6 +130,9 @@ def save_to_csv(data: dict, output_path: str):
         # throughput
         "requests_thr","errors","p50_tps","p95_tps","mean_tps",
         "total_tokens","wall_time_sec","aggregate_throughput",
+        # warmup / steady-state / repeated trials
+        "warmup_requests","steady_throughput","trials","requests","steady_fallback",
+        *[f"{m}_{b}" for m in CI_METRICS for b in ("lo", "hi")],
     ]
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     with open(output_path, "w", newline="") as csvfile:
@@ -16,27 +16,13 @@
 #  - --model "Qwen/Qwen2.5-7B-Instruct"
 #  - --input results/bench_runs  --output results/figures
 
-import argparse, os, sys, glob, re
+import argparse, os, sys
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 
-try:
-    from bench_utils import metadata_from_filename  # shared helper if present
-except Exception:
-    FNAME_META = re.compile(
-        r"run_(?P<mode>agg|disagg)_model_(?P<modeltag>.+?)_conc(?P<conc>\d+)_pt(?P<pt>\d+)_mt(?P<mt>\d+)\.csv$"
-    )
-    def metadata_from_filename(path: str):
-        base = os.path.basename(path)
-        m = FNAME_META.search(base)
-        if not m: return {}
-        out = m.groupdict()
-        out["conc"] = int(out.pop("conc"))
-        out["pt"]   = int(out.pop("pt"))
-        out["mt"]   = int(out.pop("mt"))
-        out["modeltag"] = out.pop("modeltag")
-        return {"mode": out["mode"], "model_tag": out["modeltag"],
-                "concurrency": out["conc"], "prompt_tokens": out["pt"], "max_tokens": out["mt"]}
+from bench_dataset import FigureManifest, load_runs, resolve_glob, slice_digest
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
@@ -50,6 +36,7 @@ def parse_args():
     p.add_argument("--model", type=str, help="Optional model_tag filter")
     p.add_argument("--input", default="results/bench_runs", help="Input dir or glob for CSVs")
     p.add_argument("--output", default="results/figures", help="Output dir for figures")
+    p.add_argument("--force", action="store_true", help="Re-render even if the input slice is unchanged")
     return p.parse_args()
 
 def validate_mode(a):
@@ -60,28 +47,12 @@ def validate_mode(a):
     sweep_dim = missing.pop()
     return provided, sweep_dim
 
-def load_all(csv_glob):
-    paths = sorted(glob.glob(csv_glob))
-    if not paths: sys.exit(f"No CSV files found in {csv_glob}")
-    frames=[]
-    for pth in paths:
-        try:
-            df = pd.read_csv(pth)
-        except Exception:
-            continue
-        meta = metadata_from_filename(pth)
-        for k,v in meta.items():
-            df[k] = v
-        if "mean_tps" not in df.columns and "mean_tokens_per_sec" in df.columns:
-            df["mean_tps"] = df["mean_tokens_per_sec"]
-        frames.append(df)
-    if not frames:
-        sys.exit("No readable CSVs.")
-    df = pd.concat(frames, ignore_index=True)
-    for c in ["concurrency","prompt_tokens","max_tokens","mean_tps","p50_ttft"]:
+def load_all(csv_glob, cache_path=None):
+    df = load_runs(csv_glob, cache_path)
+    if df.empty: sys.exit(f"No CSV files found in {csv_glob}")
+    for c in ["mean_tps_lo","mean_tps_hi","p50_ttft_lo","p50_ttft_hi"]:
         if c in df.columns:
             df[c] = pd.to_numeric(df[c], errors="coerce")
-    df = df.drop_duplicates(subset=["mode","model_tag","concurrency","prompt_tokens","max_tokens"], keep="last")
     return df
 
 def main():
@@ -89,8 +60,7 @@ def main():
     fixed, sweep_dim = validate_mode(a)
 
     os.makedirs(a.output, exist_ok=True)
-    csv_glob = a.input if not os.path.isdir(a.input) else os.path.join(a.input, "run_*.csv")
-    df = load_all(csv_glob)
+    df = load_all(resolve_glob(a.input), os.path.join(a.output, ".runs_cache.pkl"))
     df = df[df["mode"].isin(["agg","disagg"])]
 
     # Apply fixed filters
@@ -102,13 +72,33 @@ def main():
     if df.empty:
         sys.exit(f"No data matching filters: fixed={fixed}, sweep={sweep_dim}, model={a.model or 'ANY'}")
 
+    # Output names
+    tag = f"{a.metric}"
+    for k in ["concurrency","prompt_tokens","max_tokens"]:
+        if k in fixed: tag += f"_{k}{fixed[k]}"
+    fig_path = os.path.join(a.output, f"compare_agg_disagg_sweep_{sweep_dim}_{tag}.png")
+    raw_path = os.path.join(a.output, f"raw_compare_sweep_{sweep_dim}_{tag}.csv")
+
+    # Skip rendering when this exact slice was already plotted
+    df = df.drop(columns=["_source"]).sort_values(["mode", sweep_dim]).reset_index(drop=True)
+    manifest = FigureManifest(a.output)
+    digest = slice_digest(df, f"{a.metric}|{a.model}")
+    if not a.force and manifest.is_fresh(fig_path, digest) and os.path.exists(raw_path):
+        print(f"[OK] Unchanged, skipped: {fig_path}")
+        return
+
     # Prepare plot
     plt.figure(figsize=(8,6))
     for mode in ["agg","disagg"]:
         sub = df[df["mode"] == mode]
         if sub.empty: continue
-        grouped = sub.groupby(sweep_dim, as_index=False)[a.metric].mean().sort_values(sweep_dim)
-        plt.plot(grouped[sweep_dim], grouped[a.metric], marker="o", label=mode)
+        cols = [a.metric] + [c for c in (f"{a.metric}_lo", f"{a.metric}_hi") if c in sub.columns]
+        grouped = sub.groupby(sweep_dim, as_index=False)[cols].mean().sort_values(sweep_dim)
+        line, = plt.plot(grouped[sweep_dim], grouped[a.metric], marker="o", label=mode)
+        # Bootstrap CI band when the runs carry one (bench_pd.py --trials / steady-state samples)
+        if len(cols) == 3 and grouped[cols[1:]].notna().all(axis=None):
+            plt.fill_between(grouped[sweep_dim], grouped[cols[1]], grouped[cols[2]],
+                             color=line.get_color(), alpha=0.2)
 
     # Labels/titles
     axis_label = {"concurrency":"Concurrency",
@@ -124,17 +114,13 @@ def main():
     plt.xlabel(axis_label); plt.ylabel(ylabel); plt.title(", ".join(title_bits))
     plt.legend(title="mode"); plt.grid(True); plt.tight_layout()
 
-    # Output names
-    tag = f"{a.metric}"
-    for k in ["concurrency","prompt_tokens","max_tokens"]:
-        if k in fixed: tag += f"_{k}{fixed[k]}"
-    fig_path = os.path.join(a.output, f"compare_agg_disagg_sweep_{sweep_dim}_{tag}.png")
     plt.savefig(fig_path)
     print(f"[OK] Saved: {fig_path}")
 
-    raw_path = os.path.join(a.output, f"raw_compare_sweep_{sweep_dim}_{tag}.csv")
     df.to_csv(raw_path, index=False)
     print(f"[OK] Raw data: {raw_path}")
+    manifest.update(fig_path, digest)
+    manifest.save()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,162 @@
+#!/usr/bin/env bash
+# scripts/regression_gate.sh
+set -euo pipefail
+
+# ==========================================
+# GPU-free performance regression gate
+# (proxy + mock prefill/decode/agg backends,
+#  small sweep, compare against stored baseline)
+# ==========================================
+#
+# First run (or UPDATE_BASELINE=1) stores the baseline: BASELINE_RUNS separate sweeps, each on
+# freshly started servers, so the gate sees the run-to-run noise of the setup (t interval).
+# Everything shares the host's CPUs, whose speed drifts over minutes on shared machines; if the
+# gate fails, it re-runs the candidate and only fails on regressions that show up again (CONFIRM=1).
+# Exit code is that of check_regression.py (0 = pass, 1 = regression, 2 = settings mismatch).
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+cd "${ROOT_DIR}"
+
+# -------- Parameters --------
+MODEL="${MODEL:-Qwen/Qwen2.5-7B-Instruct}"
+BASELINE_DIR="${BASELINE_DIR:-results/baseline_mock}"
+CANDIDATE_DIR="${CANDIDATE_DIR:-results/gate_mock}"
+UPDATE_BASELINE="${UPDATE_BASELINE:-0}"
+BASELINE_RUNS="${BASELINE_RUNS:-5}"  # separate baseline sweeps (>= 2 for a noise estimate)
+# ~50 metric/point comparisons per gate: at 0.05 one of them is a false alarm most of the time
+GATE_ALPHA="${GATE_ALPHA:-0.01}"
+# Tolerance overrides for check_regression.py; only p95 is wider than its default (0.15), since
+# the p95 of ~100 requests moves by ~15% between runs of the same code on a shared host
+GATE_TOL="${GATE_TOL:-p95_ttft=0.25}"
+CONFIRM="${CONFIRM:-1}"             # re-run the candidate once to confirm a reported regression
+MODE_SET="${MODE_SET:-both}"
+REQUESTS="${REQUESTS:-32}"
+TRIALS="${TRIALS:-3}"
+CONCURRENCIES="${CONCURRENCIES:-1 4 16}"
+PROMPT_TOKENS="${PROMPT_TOKENS:-256 2048}"
+MAX_TOKENS="${MAX_TOKENS:-64}"
+GATE_ARGS="${GATE_ARGS:-}"          # extra args for check_regression.py (e.g. "--fail-on-missing")
+
+# Ports: proxy ports are the proxy's defaults
+PROXY_HTTP_PORT=10001
+PROXY_ZMQ_PORT=30001
+PROD_HTTP_PORT="${PROD_HTTP_PORT:-8100}"
+PROD_ZMQ_PORT="${PROD_ZMQ_PORT:-14580}"
+CONS_HTTP_PORT="${CONS_HTTP_PORT:-8200}"
+CONS_ZMQ_PORT="${CONS_ZMQ_PORT:-14579}"
+AGG_HTTP_PORT="${AGG_HTTP_PORT:-9000}"
+
+LOG_DIR="${ROOT_DIR}/logs/gate"
+mkdir -p "${LOG_DIR}"
+export OPENAI_API_KEY="${OPENAI_API_KEY:-sk-noop}"
+export PYTHONUNBUFFERED=1
+
+PIDS=()
+stop_servers() {
+  for pid in "${PIDS[@]}"; do kill "$pid" 2>/dev/null || true; done
+  sleep 1
+  # Escalate in case a server does not exit on TERM within the grace period
+  for pid in "${PIDS[@]}"; do kill -9 "$pid" 2>/dev/null || true; done
+  PIDS=()
+}
+trap stop_servers EXIT INT TERM
+
+kv_json() {
+  # $1 role, $2 http_port, $3 zmq_port
+  echo "{\"kv_connector\":\"P2pNcclConnector\",\"kv_role\":\"$1\",\"kv_ip\":\"127.0.0.1\",\"kv_port\":$3,\
+\"kv_connector_extra_config\":{\"http_port\":\"$2\",\"proxy_ip\":\"127.0.0.1\",\"proxy_port\":\"${PROXY_ZMQ_PORT}\"}}"
+}
+
+# Ready = an end-to-end request through the proxy (needs both P and D registered) and the agg server
+REQ='{"model":"'"${MODEL}"'","messages":[{"role":"user","content":"hello"}],"max_tokens":4,"stream":false}'
+ready() {
+  [[ "$(curl -s -o /dev/null -w '%{http_code}' -H 'Content-Type: application/json' --data "${REQ}" \
+       "http://127.0.0.1:$1/v1/chat/completions" || true)" == "200" ]]
+}
+
+# -------- Launch --------
+start_servers() {
+  echo "🚀 Launch: proxy + mock producer/consumer/agg"
+  ( cd proxy && exec python3 disagg_proxy_p2p_nccl_xpyd.py ) > "${LOG_DIR}/proxy.log" 2>&1 &
+  PIDS+=($!)
+  python3 setup/mock_vllm_server.py serve "${MODEL}" --port "${PROD_HTTP_PORT}" \
+    --kv-transfer-config "$(kv_json kv_producer "${PROD_HTTP_PORT}" "${PROD_ZMQ_PORT}")" \
+    > "${LOG_DIR}/producer.log" 2>&1 &
+  PIDS+=($!)
+  python3 setup/mock_vllm_server.py serve "${MODEL}" --port "${CONS_HTTP_PORT}" \
+    --kv-transfer-config "$(kv_json kv_consumer "${CONS_HTTP_PORT}" "${CONS_ZMQ_PORT}")" \
+    > "${LOG_DIR}/consumer.log" 2>&1 &
+  PIDS+=($!)
+  python3 setup/mock_vllm_server.py serve "${MODEL}" --port "${AGG_HTTP_PORT}" \
+    > "${LOG_DIR}/agg.log" 2>&1 &
+  PIDS+=($!)
+
+  local i
+  for i in $(seq 1 60); do
+    ready "${PROXY_HTTP_PORT}" && ready "${AGG_HTTP_PORT}" && break
+    sleep 0.5
+  done
+  ready "${PROXY_HTTP_PORT}" || { echo "❌ proxy not ready; see ${LOG_DIR}"; exit 2; }
+  ready "${AGG_HTTP_PORT}"   || { echo "❌ agg mock not ready; see ${LOG_DIR}"; exit 2; }
+  echo "✅ Mock cluster ready"
+}
+
+# -------- Sweep (full grid: no plateau stop, so points always match the baseline) --------
+run_sweep() {
+  # $1 output dir
+  rm -rf "$1"
+  MODE_SET="${MODE_SET}" python3 scripts/sweep_bench.py \
+    --model "${MODEL}" \
+    --requests "${REQUESTS}" \
+    --trials "${TRIALS}" \
+    --concurrencies "${CONCURRENCIES}" \
+    --prompt-tokens "${PROMPT_TOKENS}" \
+    --max-tokens "${MAX_TOKENS}" \
+    --disagg-url "http://127.0.0.1:${PROXY_HTTP_PORT}/v1/chat/completions" \
+    --agg-url "http://127.0.0.1:${AGG_HTTP_PORT}/v1/chat/completions" \
+    --output-dir "$1" \
+    --resume 0 \
+    --plateau-patience 1000000
+}
+
+# -------- Baseline --------
+if [[ "${UPDATE_BASELINE}" == "1" ]] || ! compgen -G "${BASELINE_DIR}/set_*" > /dev/null; then
+  rm -rf "${BASELINE_DIR}"
+  for i in $(seq 1 "${BASELINE_RUNS}"); do
+    echo "📌 Baseline run ${i}/${BASELINE_RUNS}"
+    start_servers
+    run_sweep "${BASELINE_DIR}/set_${i}"
+    stop_servers
+  done
+  echo "📌 Stored baseline (${BASELINE_RUNS} runs) in ${BASELINE_DIR}"
+  exit 0
+fi
+
+# -------- Gate --------
+gate() {
+  # $@ extra check_regression.py args
+  # shellcheck disable=SC2086
+  python3 scripts/check_regression.py \
+    --baseline "${BASELINE_DIR}"/set_* \
+    --candidate "${CANDIDATE_DIR}" \
+    --report "${CANDIDATE_DIR}/regression_report.md" \
+    --alpha "${GATE_ALPHA}" \
+    ${GATE_TOL:+--tol ${GATE_TOL}} \
+    "$@" ${GATE_ARGS}
+}
+
+start_servers
+run_sweep "${CANDIDATE_DIR}"
+stop_servers
+
+rc=0
+gate || rc=$?
+if [[ "${rc}" == "1" && "${CONFIRM}" == "1" ]]; then
+  echo "🔁 Regression reported; re-running the candidate on fresh servers to confirm"
+  start_servers
+  run_sweep "${CANDIDATE_DIR}_confirm"
+  stop_servers
+  rc=0
+  gate --confirm "${CANDIDATE_DIR}_confirm" || rc=$?
+fi
+exit "${rc}"
@@ -0,0 +1,63 @@
+# scripts/results_store.py
+#!/usr/bin/env python3
+"""
+results_store.py
+Append-only JSONL store of parsed benchmark points, keyed by
+(mode, model_tag, concurrency, prompt_tokens, max_tokens).
+Later records for the same key win, so re-running a point simply appends.
+"""
+
+import json
+import os
+import time
+
+KEY_COLS = ["mode", "model_tag", "concurrency", "prompt_tokens", "max_tokens"]
+
+
+def point_key(rec: dict):
+    return tuple(rec.get(k) for k in KEY_COLS)
+
+
+class ResultsStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._latest = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn last line from an interrupted sweep; ignore it.
+                        continue
+                    self._latest[point_key(rec)] = rec
+
+    def get(self, mode, model_tag, concurrency, prompt_tokens, max_tokens, requests=None, trials=None, warmup=None):
+        """Return the latest record for the point, or None.
+        Each of `requests`, `trials` and `warmup` that is given must match the value the
+        record was measured with (records that predate a field never match it).
+        """
+        rec = self._latest.get((mode, model_tag, concurrency, prompt_tokens, max_tokens))
+        if rec is None:
+            return None
+        for field, want in (("requests", requests), ("trials", trials), ("warmup", warmup)):
+            if want is not None and rec.get(field) != want:
+                return None
+        return rec
+
+    def put(self, rec: dict):
+        rec = dict(rec)
+        rec.setdefault("recorded_at", time.time())
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec) + "\n")
+        self._latest[point_key(rec)] = rec
+        return rec
+
+    def records(self):
+        return list(self._latest.values())
@@ -11,7 +11,9 @@ set -euo pipefail
 # -------- Parameters --------
 MODEL="${MODEL:-Qwen/Qwen2.5-7B-Instruct}"
 OUTPUT_DIR="${OUTPUT_DIR:-results/bench_runs}"
-REQUESTS="${REQUESTS:-10}"
+REQUESTS="${REQUESTS:-32}"   # per trial; sweep_bench.py raises it per point to fill the steady-state window
+TRIALS="${TRIALS:-1}"        # repeated trials per point (bootstrap CIs across trials)
+WARMUP="${WARMUP:-}"         # warmup requests per point (default: the point's concurrency)
 
 # Sweeps
 CONCURRENCIES=(${CONCURRENCIES:-1 2 4 8 16 32})
@@ -22,84 +24,59 @@ MAX_TOKENS=(${MAX_TOKENS:-512 1024 2048 4096 8192})
 MODE_SET="${MODE_SET:-both}"
 
 # Behavior toggles
-RESUME="${RESUME:-1}"              # if 1, skip when CSV exists
-FORCE_RECOLLECT="${FORCE_RECOLLECT:-0}"  # if 1, always regenerate CSV from log
+RESUME="${RESUME:-1}"              # if 1, reuse points already in the results store
 RUN_PLOTS="${RUN_PLOTS:-1}"        # if 1, call plot_bench_results.py at the end
 POST_COLLECT_ALL="${POST_COLLECT_ALL:-0}" # if 1, sweep all .log and recollect CSVs
 
+# Adaptive sweep (see scripts/sweep_bench.py)
+PLATEAU_TOL="${PLATEAU_TOL:-0.05}"       # relative throughput gain counted as "still scaling"
+PLATEAU_PATIENCE="${PLATEAU_PATIENCE:-1}" # non-improving points before stopping a concurrency sweep
+TTFT_SLO="${TTFT_SLO:-}"                  # seconds; if set, binary-search the SLO knee instead
+
+# Endpoints (same defaults as bench_proxy.sh / bench_agg.sh: SRV_IP, else the proxy
+# on 172.16.40.99 and the aggregated server on 127.0.0.1)
+PROXY_IP="${SRV_IP:-172.16.40.99}"
+AGG_IP="${SRV_IP:-127.0.0.1}"
+PROXY_HTTP_PORT="${PROXY_HTTP_PORT:-10001}"
+AGG_HTTP_PORT="${AGG_HTTP_PORT:-9000}"
+
 # Paths
-PROXY_BENCH="${PROXY_BENCH:-./bench/bench_proxy.sh}"
-AGG_BENCH="${AGG_BENCH:-./bench/bench_agg.sh}"
+SWEEP_PY="${SWEEP_PY:-scripts/sweep_bench.py}"
 COLLECT_PY="${COLLECT_PY:-scripts/collect_from_log.py}"
 PLOT_PY="${PLOT_PY:-scripts/plot_bench_results.py}"
 
-mkdir -p "${OUTPUT_DIR}"
-
-# -------- Helpers --------
-run_one() {
-  local mode="$1"  # disagg or agg
-  local conc="$2"
-  local p_t="$3"
-  local m_t="$4"
-
-  local MODEL_TAG
-  MODEL_TAG=$(echo "${MODEL}" | tr '/:' '_')
-  local RUN_ID="${mode}_model_${MODEL_TAG}_conc${conc}_pt${p_t}_mt${m_t}"
-
-  local LOG_FILE="${OUTPUT_DIR}/run_${RUN_ID}.log"
-  local CSV_FILE="${OUTPUT_DIR}/run_${RUN_ID}.csv"
-
-  if [[ "${RESUME}" == "1" && -s "${CSV_FILE}" ]]; then
-    echo "⏭  Skip (CSV exists): ${CSV_FILE}"
-    return 0
-  fi
+case "${MODE_SET}" in
+  disagg|agg) MODES=("${MODE_SET}") ;;
+  both)       MODES=(disagg agg) ;;
+  *) echo "Unknown MODE_SET='${MODE_SET}' (use disagg|agg|both)"; exit 2;;
+esac
 
-  echo "=== Running ${RUN_ID} (N=${REQUESTS}) ==="
-  if [[ "$mode" == "disagg" ]]; then
-    "${PROXY_BENCH}" \
-      --model "${MODEL}" \
-      --requests "${REQUESTS}" \
-      --concurrency "${conc}" \
-      --prompt-tokens "${p_t}" \
-      --max-tokens "${m_t}" \
-      > "${LOG_FILE}" 2>&1
-  else
-    "${AGG_BENCH}" \
-      --model "${MODEL}" \
-      --requests "${REQUESTS}" \
-      --concurrency "${conc}" \
-      --prompt-tokens "${p_t}" \
-      --max-tokens "${m_t}" \
-      > "${LOG_FILE}" 2>&1
-  fi
-
-  if [[ "${FORCE_RECOLLECT}" == "1" || ! -s "${CSV_FILE}" ]]; then
-    python3 "${COLLECT_PY}" --input "${LOG_FILE}" --output "${CSV_FILE}" || true
-  fi
-  echo "✅ Saved CSV to ${CSV_FILE}"
-}
+mkdir -p "${OUTPUT_DIR}"
 
 # -------- Main Sweep --------
-for conc in "${CONCURRENCIES[@]}"; do
-  for p_t in "${PROMPT_TOKENS[@]}"; do
-    for m_t in "${MAX_TOKENS[@]}"; do
-      case "${MODE_SET}" in
-        disagg)
-          run_one "disagg" "${conc}" "${p_t}" "${m_t}"
-          ;;
-        agg)
-          run_one "agg" "${conc}" "${p_t}" "${m_t}"
-          ;;
-        both)
-          run_one "disagg" "${conc}" "${p_t}" "${m_t}"
-          run_one "agg"    "${conc}" "${p_t}" "${m_t}"
-          ;;
-        *)
-          echo "Unknown MODE_SET='${MODE_SET}' (use disagg|agg|both)"; exit 2;;
-      esac
-    done
-  done
-done
+EXTRA_ARGS=()
+if [[ -n "${TTFT_SLO}" ]]; then
+  EXTRA_ARGS=(--ttft-slo "${TTFT_SLO}")
+fi
+if [[ -n "${WARMUP}" ]]; then
+  EXTRA_ARGS+=(--warmup "${WARMUP}")
+fi
+
+python3 "${SWEEP_PY}" \
+  --model "${MODEL}" \
+  --modes "${MODES[@]}" \
+  --requests "${REQUESTS}" \
+  --trials "${TRIALS}" \
+  --concurrencies "${CONCURRENCIES[*]}" \
+  --prompt-tokens "${PROMPT_TOKENS[*]}" \
+  --max-tokens "${MAX_TOKENS[*]}" \
+  --disagg-url "http://${PROXY_IP}:${PROXY_HTTP_PORT}/v1/chat/completions" \
+  --agg-url "http://${AGG_IP}:${AGG_HTTP_PORT}/v1/chat/completions" \
+  --output-dir "${OUTPUT_DIR}" \
+  --resume "${RESUME}" \
+  --plateau-tol "${PLATEAU_TOL}" \
+  --plateau-patience "${PLATEAU_PATIENCE}" \
+  "${EXTRA_ARGS[@]}"
 
 # -------- Optional post-collection over all logs --------
 if [[ "${POST_COLLECT_ALL}" == "1" ]]; then
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# scripts/sweep_bench.py
+# --------------------------------
+# Adaptive benchmark sweep (replaces the nested loops in run_bench_vars.sh).
+#   - Benchmarks run in-process through bench/bench_pd.py, one warm HTTP session per mode,
+#     and modes are swept one after the other so each server stays hot across points.
+#   - Concurrency is swept upward per (prompt_tokens, max_tokens) and stops once aggregate
+#     throughput has plateaued (saturation), instead of running every grid point.
+#   - With --ttft-slo, concurrency is binary-searched for the highest value whose TTFT meets the SLO.
+#   - Every point is appended to a JSONL results store; --resume reuses stored points
+#     (including their metrics, so adaptive decisions are reproducible across restarts).
+#
+# Per-point .log/.csv files are still written in the run_<mode>_model_..._mtN format,
+# so collect_from_log.py / plot_bench_results.py keep working unchanged.
+#
+# Examples:
+#   python3 scripts/sweep_bench.py
+#   python3 scripts/sweep_bench.py --modes disagg --prompt-tokens 1024 --max-tokens 512 --ttft-slo 2.0
+#
+import argparse
+import asyncio
+import csv
+import os
+import sys
+import time
+from urllib.parse import urlparse
+
+from bench_utils import model_tag_for, run_id_for
+from collect_from_log import parse_log, save_to_csv
+from results_store import ResultsStore
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+import bench_metrics  # noqa: E402
+import bench_pd  # noqa: E402
+
+
+def _ints(s):
+    return [int(x) for x in str(s).replace(",", " ").split()]
+
+
+def parse_args():
+    # Same host defaults as bench/bench_proxy.sh and bench/bench_agg.sh
+    proxy_ip, agg_ip = os.getenv("SRV_IP") or "172.16.40.99", os.getenv("SRV_IP") or "127.0.0.1"
+    p = argparse.ArgumentParser(description="Adaptive agg/disagg benchmark sweep.")
+    p.add_argument("--model", default=os.getenv("MODEL", "Qwen/Qwen2.5-7B-Instruct"))
+    p.add_argument("--modes", nargs="+", choices=["disagg", "agg"], default=None,
+                   help="Modes to run (default from MODE_SET: disagg|agg|both)")
+    p.add_argument("--requests", type=int, default=int(os.getenv("REQUESTS", "32")),
+                   help="Requests per trial; raised per point to what the steady-state window needs "
+                        "(bench_pd.min_steady_requests: max(20, 2*conc) + conc)")
+    p.add_argument("--concurrencies", type=_ints, default=_ints(os.getenv("CONCURRENCIES", "1 2 4 8 16 32")))
+    p.add_argument("--prompt-tokens", type=_ints, default=_ints(os.getenv("PROMPT_TOKENS", "256 512 1024 2048 4096 8192")))
+    p.add_argument("--max-tokens", type=_ints, default=_ints(os.getenv("MAX_TOKENS", "512 1024 2048 4096 8192")))
+    p.add_argument("--disagg-url", default=f"http://{proxy_ip}:{os.getenv('PROXY_HTTP_PORT', '10001')}/v1/chat/completions")
+    p.add_argument("--agg-url", default=f"http://{agg_ip}:{os.getenv('AGG_HTTP_PORT', '9000')}/v1/chat/completions")
+    p.add_argument("--output-dir", default=os.getenv("OUTPUT_DIR", "results/bench_runs"))
+    p.add_argument("--store", default=None, help="Results store (default: <output-dir>/results.jsonl)")
+    p.add_argument("--resume", type=int, choices=[0, 1], default=int(os.getenv("RESUME", "1")),
+                   help="Reuse points already in the results store (default: 1)")
+    p.add_argument("--plateau-tol", type=float, default=0.05,
+                   help="Relative aggregate-throughput gain below which a point counts as no improvement")
+    p.add_argument("--plateau-patience", type=int, default=1,
+                   help="Stop the concurrency sweep after this many consecutive non-improving points")
+    p.add_argument("--ttft-slo", type=float, default=None,
+                   help="TTFT SLO in seconds; if set, binary-search the highest concurrency meeting it")
+    p.add_argument("--slo-metric", choices=["p50_ttft", "p95_ttft"], default="p95_ttft")
+    p.add_argument("--warmup", type=int, default=int(os.environ["WARMUP"]) if os.getenv("WARMUP") else None,
+                   help="Warmup requests per point, excluded from results (default: the point's concurrency)")
+    p.add_argument("--trials", type=int, default=int(os.getenv("TRIALS", "1")),
+                   help="Repeated trials per point, used for bootstrap CIs")
+    p.add_argument("--scrape-interval", type=float, default=float(os.getenv("SCRAPE_INTERVAL", "1.0")),
+                   help="Seconds between server /metrics scrapes (0 = off); series go to <output-dir>/samples/")
+    p.add_argument("--live-interval", type=float, default=float(os.getenv("LIVE_INTERVAL", "5.0")),
+                   help="Seconds between live status lines on stderr (0 = off)")
+    p.add_argument("--http-timeout", type=float, default=600)
+    a = p.parse_args()
+    if a.modes is None:
+        mode_set = os.getenv("MODE_SET", "both")
+        if mode_set not in ("disagg", "agg", "both"):
+            sys.exit(f"Unknown MODE_SET='{mode_set}' (use disagg|agg|both)")
+        a.modes = ["disagg", "agg"] if mode_set == "both" else [mode_set]
+    a.concurrencies = sorted(set(a.concurrencies))
+    if a.store is None:
+        a.store = os.path.join(a.output_dir, "results.jsonl")
+    return a
+
+
+class Sweep:
+    def __init__(self, args, store: ResultsStore):
+        self.args = args
+        self.store = store
+        self.model_tag = model_tag_for(args.model)
+        self.ran = 0
+        self.reused = 0
+
+    async def measure(self, session, url, mode, conc, pt, mt):
+        """Return the record for one point, from the store (resume) or by running it."""
+        a = self.args
+        requests = max(a.requests, bench_pd.min_steady_requests(conc))
+        warm = conc if a.warmup is None else a.warmup
+        if a.resume:
+            rec = self.store.get(mode, self.model_tag, conc, pt, mt,
+                                 requests=requests, trials=a.trials, warmup=warm)
+            if rec is not None:
+                print(f"⏭  Reuse stored point: {mode} conc={conc} pt={pt} mt={mt}")
+                self.reused += 1
+                return rec
+
+        run_id = run_id_for(mode, self.model_tag, conc, pt, mt)
+        log_file = os.path.join(a.output_dir, f"run_{run_id}.log")
+        csv_file = os.path.join(a.output_dir, f"run_{run_id}.csv")
+        print(f"=== Running {run_id} (N={requests}) ===")
+
+        lines = [f"🚀 Running {mode} bench against {url} (model={a.model})"]
+        targets = bench_metrics.disagg_targets(urlparse(url).hostname) if mode == "disagg" \
+            else bench_metrics.default_targets(url)
+        trials, scraper, t_ref = await bench_pd.run_monitored(
+            session, url, bench_pd.auth_headers(), a.model, requests, conc, pt, mt,
+            warmup_requests=warm, trials=a.trials, targets=targets, scrape_interval=a.scrape_interval,
+            live_interval=a.live_interval, log=lines.append)
+        lines.append(bench_pd.format_report(trials, conc, warmup_requests=warm, scraper=scraper, requests=requests))
+        with open(log_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        # Client samples and scraped server series side by side, same time origin
+        bench_metrics.write_samples(os.path.join(a.output_dir, "samples", f"run_{run_id}"), trials, scraper, t_ref)
+
+        parsed = parse_log(log_file)
+        save_to_csv(parsed, csv_file)
+        self.ran += 1
+        return self.store.put({**parsed, "requests": requests, "trials": a.trials, "warmup": warm})
+
+    async def plateau_sweep(self, session, url, mode, pt, mt):
+        """Sweep concurrency upward; stop once aggregate throughput stops improving."""
+        a = self.args
+        best, stale = None, 0
+        for conc in a.concurrencies:
+            rec = await self.measure(session, url, mode, conc, pt, mt)
+            thr = rec.get("aggregate_throughput")
+            if thr is not None and (best is None or thr > best * (1 + a.plateau_tol)):
+                best, stale = thr, 0
+            else:
+                stale += 1
+            if stale >= a.plateau_patience:
+                print(f"📉 Saturated: {mode} pt={pt} mt={mt} at conc={conc} (best={best} tok/s)")
+                return {"saturated_at": conc, "best_throughput": best}
+        return {"saturated_at": None, "best_throughput": best}
+
+    async def knee_search(self, session, url, mode, pt, mt):
+        """Binary-search the highest concurrency whose TTFT meets the SLO (assumes TTFT grows with concurrency)."""
+        a = self.args
+        concs = a.concurrencies
+        lo, hi = 0, len(concs) - 1
+        knee, knee_rec = None, None
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            rec = await self.measure(session, url, mode, concs[mid], pt, mt)
+            v = rec.get(a.slo_metric)
+            if v is not None and v <= a.ttft_slo:
+                knee, knee_rec = concs[mid], rec
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        print(f"🎯 SLO knee: {mode} pt={pt} mt={mt} {a.slo_metric}<={a.ttft_slo}s -> conc={knee}")
+        return {"slo_knee": knee,
+                "best_throughput": knee_rec.get("aggregate_throughput") if knee_rec else None}
+
+    async def run_mode(self, mode):
+        a = self.args
+        url = a.agg_url if mode == "agg" else a.disagg_url
+        summary = []
+        async with bench_pd.make_session(a.http_timeout) as session:
+            # One tiny request so the first measured point does not pay connection setup.
+            await bench_pd.run_point(session, url, bench_pd.auth_headers(), a.model, 1, 1, 16, 8, log=print)
+            for pt in a.prompt_tokens:
+                for mt in a.max_tokens:
+                    if a.ttft_slo is not None:
+                        res = await self.knee_search(session, url, mode, pt, mt)
+                    else:
+                        res = await self.plateau_sweep(session, url, mode, pt, mt)
+                    summary.append({"mode": mode, "model_tag": self.model_tag,
+                                    "prompt_tokens": pt, "max_tokens": mt, **res})
+        return summary
+
+
+def write_summary(path, rows):
+    cols = ["mode", "model_tag", "prompt_tokens", "max_tokens",
+            "saturated_at", "slo_knee", "best_throughput"]
+    with open(path, "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=cols)
+        w.writeheader()
+        for r in rows:
+            w.writerow({k: r.get(k) for k in cols})
+
+
+async def main_async(a):
+    os.makedirs(a.output_dir, exist_ok=True)
+    store = ResultsStore(a.store)
+    sweep = Sweep(a, store)
+    t0 = time.perf_counter()
+    rows = []
+    for mode in a.modes:
+        rows += await sweep.run_mode(mode)
+    summary_path = os.path.join(a.output_dir, "sweep_summary.csv")
+    write_summary(summary_path, rows)
+    full = len(a.modes) * len(a.concurrencies) * len(a.prompt_tokens) * len(a.max_tokens)
+    print(f"[INFO] Ran {sweep.ran} points, reused {sweep.reused} (full grid = {full}) "
+          f"in {time.perf_counter() - t0:.1f}s")
+    print(f"[INFO] Wrote sweep summary: {summary_path}")
+
+
+def main():
+    asyncio.run(main_async(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# setup/launch_cluster.py
+# --------------------------------
+# xPyD cluster launcher: proxy + X prefill (kv_producer) + Y decode (kv_consumer) vLLM instances
+# described by a JSON layout (see setup/layouts/). Generalizes pd_disagg_setup.sh (1P1D):
+#   - all instances start at once (no serial 300 s waits per instance)
+#   - readiness = HTTP GET /health on every instance + every instance listed by the proxy's /instances
+#   - ports are derived from the layout's bases (instance i: http = base + i, kv = base + 2*i)
+#   - any failure during bring-up tears everything down; `down` stops a running cluster
+#   - the vLLM command is replaceable (--vllm-cmd / VLLM_CMD, or --mock for setup/mock_vllm_server.py)
+#
+# Examples:
+#   python3 setup/launch_cluster.py up --layout setup/layouts/2p2d.json
+#   python3 setup/launch_cluster.py up --layout setup/layouts/1p1d.json --mock
+#   python3 setup/launch_cluster.py run --layout setup/layouts/1p1d.json --mock   # foreground, Ctrl+C stops
+#   python3 setup/launch_cluster.py down
+#
+# Layout keys (all but "prefill"/"decode" optional):
+#   {"model": "...", "max_model_len": 32768, "cache_dir": "/dev/shm/vllm_cache",
+#    "ports": {"proxy_http": 10001, "proxy_zmq": 30001, "prefill_http": 8100, "prefill_kv": 14580,
+#              "decode_http": 8200, "decode_kv": 14579},
+#    "prefill": {"count": 2, "gpus": ["0", "1"], "util": 0.8, "extra_args": ["--enforce-eager"], "env": {}},
+#    "decode":  {"count": 2, "gpus": ["2", "3"], "util": 0.8, "extra_args": [], "env": {}}}
+
+import argparse
+import json
+import os
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
+LOG_DIR = os.path.join(ROOT, "logs", "cluster")
+PID_FILE = os.path.join(LOG_DIR, "cluster.json")
+PROXY_PY = os.path.join(ROOT, "proxy", "disagg_proxy_p2p_nccl_xpyd.py")
+MOCK_CMD = f"{shlex.quote(sys.executable)} {shlex.quote(os.path.join(SCRIPT_DIR, 'mock_vllm_server.py'))}"
+
+DEFAULT_PORTS = {
+    "proxy_http": 10001, "proxy_zmq": 30001,
+    "prefill_http": 8100, "prefill_kv": 14580,
+    "decode_http": 8200, "decode_kv": 14579,
+}
+# Same SAFE flags pd_disagg_setup.sh gives the producer
+PREFILL_SAFE_ENV = {"VLLM_TORCH_COMPILE": "0", "VLLM_USE_DYNAMO": "0", "VLLM_DISABLE_CUDA_GRAPH": "1"}
+
+
+def note(msg):
+    print(f"▶ {msg}", flush=True)
+
+
+def die(msg):
+    print(f"❌ {msg}", file=sys.stderr, flush=True)
+    sys.exit(1)
+
+
+def detect_ip():
+    if os.getenv("SRV_IP"):
+        return os.environ["SRV_IP"]
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("10.255.255.255", 1))  # no packet is sent; picks the outbound interface
+            return s.getsockname()[0]
+    except OSError:
+        return "127.0.0.1"
+
+
+def port_free(port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind(("0.0.0.0", port))
+            return True
+        except OSError:
+            return False
+
+
+def http_get(url, timeout=1.0):
+    """(status, body) or (None, None) if unreachable."""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            return resp.status, resp.read()
+    except Exception:
+        return None, None
+
+
+def plan(layout, srv_ip, vllm_cmd):
+    """Expand a layout into the list of processes to start (proxy first)."""
+    ports = {**DEFAULT_PORTS, **layout.get("ports", {})}
+    model = layout.get("model", os.getenv("MODEL", "Qwen/Qwen2.5-7B-Instruct"))
+    cache_dir = layout.get("cache_dir", os.getenv("CACHE_DIR", "/dev/shm/vllm_cache"))
+    max_len = str(layout.get("max_model_len", 32768))
+
+    procs = [{
+        "name": "proxy", "role": "proxy", "http_port": ports["proxy_http"], "zmq_port": ports["proxy_zmq"],
+        "cmd": [sys.executable, PROXY_PY], "cwd": os.path.dirname(PROXY_PY),
+        "env": {"PROXY_HTTP_PORT": str(ports["proxy_http"]), "PROXY_ZMQ_PORT": str(ports["proxy_zmq"])},
+    }]
+    for role, kv_role in (("prefill", "kv_producer"), ("decode", "kv_consumer")):
+        spec = layout.get(role)
+        if not spec or int(spec.get("count", 0)) < 1:
+            die(f"layout needs at least one '{role}' instance")
+        count = int(spec["count"])
+        gpus = [str(g) for g in spec.get("gpus", [])]
+        if len(gpus) != count:
+            die(f"layout '{role}': {count} instances but {len(gpus)} gpus entries")
+        for i in range(count):
+            http_port = ports[f"{role}_http"] + i
+            kv_port = ports[f"{role}_kv"] + 2 * i
+            kv = {
+                "kv_connector": "P2pNcclConnector", "kv_role": kv_role, "kv_rank": 0, "kv_parallel_size": 1,
+                "kv_ip": srv_ip, "kv_port": kv_port,
+                "kv_connector_extra_config": {"http_port": str(http_port), "proxy_ip": srv_ip,
+                                              "proxy_port": str(ports["proxy_zmq"])},
+            }
+            env = {"CUDA_VISIBLE_DEVICES": gpus[i]}
+            if role == "prefill":
+                env.update(PREFILL_SAFE_ENV)
+            env.update({k: str(v) for k, v in spec.get("env", {}).items()})
+            procs.append({
+                "name": f"{role}{i}", "role": role, "http_port": http_port, "zmq_port": kv_port, "gpu": gpus[i],
+                "cmd": shlex.split(vllm_cmd) + [
+                    "serve", model, "--port", str(http_port), "--download-dir", cache_dir,
+                    "--gpu-memory-utilization", str(spec.get("util", 0.8)), "--max-model-len", max_len,
+                    "--kv-transfer-config", json.dumps(kv), *spec.get("extra_args", []),
+                ],
+                "cwd": ROOT, "env": env,
+            })
+    return procs, model
+
+
+def spawn(p):
+    log_path = os.path.join(LOG_DIR, f"{p['name']}.log")
+    env = {**os.environ, "PYTHONUNBUFFERED": "1", "VLLM_LOGGING_DIR": LOG_DIR, **p["env"]}
+    with open(log_path, "w") as log:
+        # Own session per instance so teardown can signal the whole process group
+        proc = subprocess.Popen(p["cmd"], cwd=p["cwd"], env=env, stdout=log, stderr=subprocess.STDOUT,
+                                stdin=subprocess.DEVNULL, start_new_session=True)
+    p["pid"], p["log"] = proc.pid, log_path
+    return proc
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+def teardown(pids, grace=10.0, handles=None):
+    """SIGTERM each process group, then SIGKILL whatever is left after `grace` seconds.
+    `handles` maps pid -> Popen for our own children: an exited child stays a zombie until it is
+    reaped, and os.kill(pid, 0) reports zombies as alive, so those are polled instead."""
+    alive = (lambda pid: handles[pid].poll() is None) if handles else _alive
+    for pid in pids:
+        try:
+            os.killpg(pid, signal.SIGTERM)
+        except OSError:
+            pass
+    deadline = time.time() + grace
+    while time.time() < deadline and any(alive(pid) for pid in pids):
+        time.sleep(0.2)
+    for pid in pids:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+def wait_ready(procs, handles, srv_ip, timeout, interval):
+    """Poll every instance's /health and the proxy's /instances until all are up."""
+    proxy = procs[0]
+    instances = procs[1:]
+    pending = {p["name"] for p in procs}
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=len(procs)) as ex:
+        while pending:
+            for p in procs:
+                if handles[p["name"]].poll() is not None:
+                    raise RuntimeError(f"{p['name']} exited early (code {handles[p['name']].returncode}); see {p['log']}")
+            todo = [p for p in instances if p["name"] in pending]
+            for p, (status, _) in zip(todo, ex.map(
+                    lambda p: http_get(f"http://127.0.0.1:{p['http_port']}/health"), todo)):
+                if status == 200:
+                    pending.discard(p["name"])
+                    note(f"{p['name']} healthy after {time.time() - t0:.1f}s (HTTP :{p['http_port']})")
+
+            if proxy["name"] in pending:
+                status, body = http_get(f"http://127.0.0.1:{proxy['http_port']}/instances")
+                if status == 200:
+                    reg = json.loads(body)
+                    got = {(r, int(a.rsplit(":", 1)[1])) for r in ("prefill", "decode") for a in reg.get(r, [])}
+                    want = {(p["role"], p["http_port"]) for p in instances}
+                    if want <= got:
+                        pending.discard(proxy["name"])
+                        note(f"proxy has all {len(want)} instances registered after {time.time() - t0:.1f}s")
+
+            if pending and time.time() - t0 > timeout:
+                raise RuntimeError(f"timeout after {timeout:.0f}s; not ready: {sorted(pending)}")
+            if pending:
+                time.sleep(interval)
+    return time.time() - t0
+
+
+def smoke_test(proxy_port, model):
+    req = json.dumps({"model": model, "messages": [{"role": "user", "content": "hello"}],
+                      "max_tokens": 16, "stream": False}).encode()
+    r = urllib.request.Request(
+        f"http://127.0.0.1:{proxy_port}/v1/chat/completions", data=req,
+        headers={"Content-Type": "application/json",
+                 "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', 'sk-noop')}"})
+    try:
+        with urllib.request.urlopen(r, timeout=120) as resp:
+            return resp.status, resp.read().decode(errors="replace")
+    except Exception as e:
+        return None, str(e)
+
+
+def cmd_up(a, foreground=False):
+    if os.path.exists(PID_FILE):
+        with open(PID_FILE) as f:
+            live = [p for p in json.load(f)["procs"] if _alive(p["pid"])]
+        if live:
+            die(f"a cluster is already running ({len(live)} processes); run `down` first")
+
+    with open(a.layout) as f:
+        layout = json.load(f)
+    srv_ip = detect_ip()
+    vllm_cmd = MOCK_CMD if a.mock else a.vllm_cmd
+    procs, model = plan(layout, srv_ip, vllm_cmd)
+
+    busy = [(p["name"], port) for p in procs for port in (p["http_port"], p["zmq_port"]) if not port_free(port)]
+    if busy:
+        die("ports already in use: " + ", ".join(f"{n}:{port}" for n, port in busy))
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    n_p = sum(p["role"] == "prefill" for p in procs)
+    note(f"SRV_IP={srv_ip} MODEL={model} layout={n_p}P{len(procs) - 1 - n_p}D cmd={vllm_cmd}")
+    handles, started = {}, []
+
+    def record():
+        # Rewritten after every spawn so `down` can always find what is already running
+        with open(PID_FILE, "w") as f:
+            json.dump({"srv_ip": srv_ip, "model": model, "procs": started}, f, indent=1)
+
+    try:
+        for p in procs:
+            handles[p["name"]] = spawn(p)
+            started.append(p)
+            record()
+            gpu = f" GPU={p['gpu']}" if "gpu" in p else ""
+            note(f"🚀 {p['name']}: HTTP={p['http_port']} ZMQ/KV={p['zmq_port']}{gpu} pid={p['pid']} ({p['log']})")
+        took = wait_ready(procs, handles, srv_ip, a.timeout, a.probe_interval)
+        if not a.no_smoke:
+            status, body = smoke_test(procs[0]["http_port"], model)
+            if status != 200:
+                raise RuntimeError(f"end-to-end request through the proxy failed (HTTP {status}): {body[:300]}")
+            note("end-to-end OK")
+    except (OSError, RuntimeError, KeyboardInterrupt) as e:
+        print(f"❌ {str(e) or 'interrupted'}; tearing down…", file=sys.stderr, flush=True)
+        teardown([p["pid"] for p in started], a.grace, {h.pid: h for h in handles.values()})
+        if os.path.exists(PID_FILE):
+            os.remove(PID_FILE)
+        sys.exit(1)
+    pids = [p["pid"] for p in procs]
+    print(f"✅ Cluster ready in {took:.1f}s — proxy http://{srv_ip}:{procs[0]['http_port']}", flush=True)
+
+    if not foreground:
+        print(f"ℹ To stop: python3 setup/launch_cluster.py down", flush=True)
+        return
+    try:
+        while all(h.poll() is None for h in handles.values()):
+            time.sleep(1)
+        dead = [n for n, h in handles.items() if h.poll() is not None]
+        print(f"❌ process exited: {dead}", file=sys.stderr, flush=True)
+    except KeyboardInterrupt:
+        pass
+    teardown(pids, a.grace, {h.pid: h for h in handles.values()})
+    os.remove(PID_FILE)
+    note("cluster stopped")
+
+
+def cmd_down(a):
+    if not os.path.exists(PID_FILE):
+        note("no running cluster recorded")
+        return
+    with open(PID_FILE) as f:
+        procs = json.load(f)["procs"]
+    teardown([p["pid"] for p in procs], a.grace)
+    os.remove(PID_FILE)
+    note(f"stopped {len(procs)} processes")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Launch / stop an xPyD disaggregated vLLM cluster.")
+    ap.add_argument("action", choices=["up", "run", "down"],
+                    help="up: start and return; run: start and stay in foreground; down: stop")
+    ap.add_argument("--layout", default=os.path.join(SCRIPT_DIR, "layouts", "1p1d.json"))
+    ap.add_argument("--vllm-cmd", default=os.getenv("VLLM_CMD", "vllm"),
+                    help="Command used instead of `vllm` (receives `serve MODEL ...`)")
+    ap.add_argument("--mock", action="store_true", help="Use setup/mock_vllm_server.py (no GPU)")
+    ap.add_argument("--timeout", type=float, default=600, help="Bring-up timeout for the whole cluster (s)")
+    ap.add_argument("--probe-interval", type=float, default=0.5)
+    ap.add_argument("--grace", type=float, default=10, help="Seconds between SIGTERM and SIGKILL on teardown")
+    ap.add_argument("--no-smoke", action="store_true", help="Skip the end-to-end request through the proxy")
+    a = ap.parse_args()
+    if a.action == "down":
+        cmd_down(a)
+    else:
+        cmd_up(a, foreground=(a.action == "run"))
+
+
+if __name__ == "__main__":
+    main()
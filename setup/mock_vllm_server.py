@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# setup/mock_vllm_server.py
+# --------------------------------
+# GPU-free stand-in for `vllm serve`, for testing the proxy, launchers and benchmarks locally.
+# Accepts the subset of `vllm serve` arguments used by the setup scripts (unknown flags are ignored),
+# so it can replace the vllm command as-is:
+#
+#   python3 setup/mock_vllm_server.py serve Qwen/Qwen2.5-7B-Instruct --port 8100 \
+#     --kv-transfer-config '{"kv_role":"kv_producer","kv_ip":"127.0.0.1","kv_port":14580,
+#                            "kv_connector_extra_config":{"proxy_ip":"127.0.0.1","proxy_port":"30001"}}'
+#
+# With a kv_producer/kv_consumer role it registers with the proxy over ZMQ exactly like
+# P2pNcclConnector ({"type": "P"|"D", "http_address", "zmq_address"}, re-sent periodically).
+# Latency model: TTFT = base + prompt_tokens * per-token prefill cost (a smaller KV-transfer cost
+# on a kv_consumer, nothing extra on a prefix-cache hit), then a fixed cost per decoded token;
+# at most --max-num-seqs requests run at once, the rest wait. Tokens are due on a fixed schedule
+# from admission, so scheduling delays on a busy host do not add up over a long generation.
+# Serves /v1/chat/completions, /v1/completions (stream or not), /v1/models, /health and
+# a Prometheus /metrics with the vllm:* series the benchmark scrapes.
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import msgpack
+import zmq
+from quart import Quart, make_response, request
+
+REGISTER_INTERVAL = 3  # seconds; proxy expires entries after DEFAULT_PING_SECONDS (5)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Mock vLLM OpenAI server (no GPU).")
+    p.add_argument("cmd", nargs="?", default="serve", help="Ignored; accepts `serve` for vllm CLI parity")
+    p.add_argument("model", nargs="?", default=os.getenv("MODEL", "Qwen/Qwen2.5-7B-Instruct"))
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--kv-transfer-config", default=None)
+    p.add_argument("--max-num-seqs", type=int, default=int(os.getenv("MOCK_MAX_NUM_SEQS", "64")))
+    p.add_argument("--ttft-base-ms", type=float, default=float(os.getenv("MOCK_TTFT_BASE_MS", "20")))
+    p.add_argument("--prefill-us-per-token", type=float, default=float(os.getenv("MOCK_PREFILL_US_PER_TOKEN", "50")))
+    p.add_argument("--kv-transfer-us-per-token", type=float, default=float(os.getenv("MOCK_KV_TRANSFER_US_PER_TOKEN", "5")),
+                   help="kv_consumer only: cost of receiving KV instead of recomputing the prefill")
+    p.add_argument("--decode-ms-per-token", type=float, default=float(os.getenv("MOCK_DECODE_MS_PER_TOKEN", "2")))
+    p.add_argument("--kv-blocks", type=int, default=int(os.getenv("MOCK_KV_BLOCKS", "4096")),
+                   help="Simulated KV cache capacity in 16-token blocks (for the usage gauge)")
+    args, _unknown = p.parse_known_args()
+    return args
+
+
+class MockEngine:
+    def __init__(self, args):
+        self.args = args
+        self.consumer = False  # kv_consumer: KV arrives from the producer, prefill is not recomputed
+        self.slots = None  # created lazily on the server's event loop
+        self.running = 0
+        self.waiting = 0
+        self.kv_blocks_used = 0
+        self.prompt_tokens_total = 0
+        self.generation_tokens_total = 0
+        self.requests_total = 0
+        self.prefix_queries_total = 0
+        self.prefix_hits_total = 0
+        self._prefix_lru = OrderedDict()  # prompt hash -> None, bounded like a real cache
+
+    def _prefix_hit(self, prefix_key):
+        hit = prefix_key in self._prefix_lru
+        self._prefix_lru[prefix_key] = None
+        self._prefix_lru.move_to_end(prefix_key)
+        while len(self._prefix_lru) > 1024:
+            self._prefix_lru.popitem(last=False)
+        return hit
+
+    async def generate(self, prompt_tokens, max_tokens, prefix_key):
+        """Yield once when the first token is ready, then once per further token."""
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.args.max_num_seqs)
+        self.waiting += 1
+        await self.slots.acquire()
+        self.waiting -= 1
+        self.running += 1
+        blocks = (prompt_tokens + max_tokens + 15) // 16
+        self.kv_blocks_used += blocks
+        try:
+            self.requests_total += 1
+            self.prompt_tokens_total += prompt_tokens
+            self.prefix_queries_total += prompt_tokens
+            prefill_s = self.args.ttft_base_ms / 1e3
+            if self._prefix_hit(prefix_key):
+                self.prefix_hits_total += prompt_tokens
+            elif self.consumer:
+                prefill_s += prompt_tokens * self.args.kv_transfer_us_per_token / 1e6
+            else:
+                prefill_s += prompt_tokens * self.args.prefill_us_per_token / 1e6
+            loop = asyncio.get_running_loop()
+            first_due = loop.time() + prefill_s
+            await asyncio.sleep(prefill_s)
+            for i in range(max_tokens):
+                if i:
+                    # Sleep until the token is due rather than for a fixed step, so a late
+                    # wakeup is made up on the next token instead of shifting all later ones
+                    due = first_due + i * self.args.decode_ms_per_token / 1e3
+                    await asyncio.sleep(max(0.0, due - loop.time()))
+                self.generation_tokens_total += 1
+                yield i
+        finally:
+            self.kv_blocks_used -= blocks
+            self.running -= 1
+            self.slots.release()
+
+    def metrics_text(self, model):
+        lbl = f'{{model_name="{model}"}}'
+        usage = min(1.0, self.kv_blocks_used / max(1, self.args.kv_blocks))
+        lines = [
+            "# TYPE vllm:num_requests_running gauge", f"vllm:num_requests_running{lbl} {self.running}",
+            "# TYPE vllm:num_requests_waiting gauge", f"vllm:num_requests_waiting{lbl} {self.waiting}",
+            "# TYPE vllm:kv_cache_usage_perc gauge", f"vllm:kv_cache_usage_perc{lbl} {usage}",
+            "# TYPE vllm:num_preemptions_total counter", f"vllm:num_preemptions_total{lbl} 0",
+            "# TYPE vllm:prefix_cache_queries_total counter", f"vllm:prefix_cache_queries_total{lbl} {self.prefix_queries_total}",
+            "# TYPE vllm:prefix_cache_hits_total counter", f"vllm:prefix_cache_hits_total{lbl} {self.prefix_hits_total}",
+            "# TYPE vllm:prompt_tokens_total counter", f"vllm:prompt_tokens_total{lbl} {self.prompt_tokens_total}",
+            "# TYPE vllm:generation_tokens_total counter", f"vllm:generation_tokens_total{lbl} {self.generation_tokens_total}",
+            "# TYPE vllm:request_success_total counter", f"vllm:request_success_total{lbl} {self.requests_total}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _prompt_text(data):
+    if "messages" in data:
+        return " ".join(str(m.get("content", "")) for m in data["messages"])
+    return str(data.get("prompt", ""))
+
+
+def _register_loop(kv_conf, http_port):
+    extra = kv_conf.get("kv_connector_extra_config", {})
+    role = {"kv_producer": "P", "kv_consumer": "D"}.get(kv_conf.get("kv_role"))
+    if role is None or not extra.get("proxy_ip"):
+        return
+    ip = kv_conf.get("kv_ip") or socket.gethostbyname(socket.gethostname())
+    msg = msgpack.dumps({
+        "type": role,
+        "http_address": f"{ip}:{extra.get('http_port', http_port)}",
+        "zmq_address": f"{ip}:{kv_conf.get('kv_port')}",
+    })
+    ctx = zmq.Context()
+    sock = ctx.socket(zmq.DEALER)
+    sock.connect(f"tcp://{extra['proxy_ip']}:{extra['proxy_port']}")
+    while True:
+        sock.send(msg)
+        time.sleep(REGISTER_INTERVAL)
+
+
+def build_app(args, kv_conf=None):
+    app = Quart(__name__)
+    engine = MockEngine(args)
+    engine.consumer = bool(kv_conf) and kv_conf.get("kv_role") == "kv_consumer"
+
+    @app.route("/health", methods=["GET"])
+    async def health():
+        return "", 200
+
+    @app.route("/metrics", methods=["GET"])
+    async def metrics():
+        return engine.metrics_text(args.model), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+    @app.route("/v1/models", methods=["GET"])
+    async def models():
+        return {"object": "list", "data": [{"id": args.model, "object": "model", "owned_by": "mock"}]}
+
+    @app.route("/v1/completions", methods=["POST"])
+    @app.route("/v1/chat/completions", methods=["POST"])
+    async def completions():
+        data = await request.get_json()
+        chat = request.path.endswith("chat/completions")
+        text = _prompt_text(data)
+        prompt_tokens = max(1, len(text.split()))
+        max_tokens = int(data.get("max_completion_tokens") or data.get("max_tokens") or 16)
+        prefix_key = hash(text)
+        rid = f"{'chatcmpl' if chat else 'cmpl'}-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        def piece(i):
+            if chat:
+                return {"index": 0, "delta": {"content": " tok"} if i else {"role": "assistant", "content": "tok"},
+                        "finish_reason": None}
+            return {"index": 0, "text": " tok", "finish_reason": None}
+
+        if data.get("stream"):
+            async def gen():
+                async for i in engine.generate(prompt_tokens, max_tokens, prefix_key):
+                    chunk = {"id": rid, "object": "chat.completion.chunk" if chat else "text_completion",
+                             "created": created, "model": args.model, "choices": [piece(i)]}
+                    yield f"data: {json.dumps(chunk)}\n\n".encode()
+                yield b"data: [DONE]\n\n"
+            response = await make_response(gen(), 200, {"Content-Type": "text/event-stream"})
+            response.timeout = None
+            return response
+
+        n = 0
+        async for _ in engine.generate(prompt_tokens, max_tokens, prefix_key):
+            n += 1
+        text = " ".join(["tok"] * n)
+        choice = ({"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "length"}
+                  if chat else {"index": 0, "text": text, "finish_reason": "length"})
+        return {
+            "id": rid, "object": "chat.completion" if chat else "text_completion", "created": created,
+            "model": args.model, "choices": [choice],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": n,
+                      "total_tokens": prompt_tokens + n},
+        }
+
+    return app
+
+
+def main():
+    args = parse_args()
+    kv_conf = json.loads(args.kv_transfer_config) if args.kv_transfer_config else None
+    if kv_conf:
+        threading.Thread(target=_register_loop, args=(kv_conf, args.port), daemon=True).start()
+    app = build_app(args, kv_conf)
+    app.run(host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()